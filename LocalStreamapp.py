@@ -16,12 +16,11 @@ if os.name == "nt" and hasattr(os, "add_dll_directory"):
 os.environ.setdefault("VLC_PLUGIN_PATH", str(vlc_dir / "plugins"))
 # ---- end VLC bootstrap ----
 
-import sys, threading, traceback
+import stat, sys, threading, traceback
 from pathlib import Path
 import customtkinter as ctk
 from tkinter import messagebox
 import tkinter as tk
-import random
 
 
 # Local imports
@@ -35,6 +34,16 @@ except Exception:
     print("Failed to import search.py. Ensure gui_ctk.py is next to search.py and fetcher.py.")
     raise
 
+import change_tracker
+import catalog
+import gradient
+import prefetch
+import queue_engine
+import reconcile
+import scheduler
+import ui_dispatch
+import virtual_list
+
 try:
     from playback_service import PlaybackService
 except Exception:
@@ -73,21 +82,9 @@ ctk.set_appearance_mode("dark")
 
 #customtkinter has no gradient function, this helper creates the gradient
 #function used in the titlecards of the app
+#(one cached image per colors/height, shared by every page, see gradient.py)
 def paint_vertical_gradient(canvas: tk.Canvas, color1: str, color2: str):
-    canvas.delete("all")
-    w, h = int(canvas.winfo_width()), int(canvas.winfo_height())
-    if w <= 0 or h <= 0:
-        return
-    r1, g1, b1 = canvas.winfo_rgb(color1)
-    r2, g2, b2 = canvas.winfo_rgb(color2)
-    dr = (r2 - r1) / max(1, h)
-    dg = (g2 - g1) / max(1, h)
-    db = (b2 - b1) / max(1, h)
-    for y in range(h):
-        rr = int(r1 + dr * y) // 256
-        gg = int(g1 + dg * y) // 256
-        bb = int(b1 + db * y) // 256
-        canvas.create_line(0, y, w, y, fill=f"#{rr:02x}{gg:02x}{bb:02x}")
+    gradient.get_renderer().paint(canvas, color1, color2)
 
 #Main app graphics body, this controls all the visual and interactable elements, all later classes are utilized here
 #Structure its that the left Menu and the bottom music bar+controls are always on display
@@ -97,8 +94,13 @@ def paint_vertical_gradient(canvas: tk.Canvas, color1: str, color2: str):
 class MusicGUI(ctk.CTk):
     def __init__(self):
         super().__init__()
+        #Worker threads reach widgets only through this queue; the Tk loop
+        #drains it once per frame, keeping just the latest status update
+        self.ui = ui_dispatch.UIDispatcher(self)
         vlc_dir = Path(__file__).parent / "third_party" / "vlc-3.0.21-win64" / "vlc-3.0.21"
-        self.player = PlaybackService(vlc_dir=vlc_dir)
+        # returns at once: libVLC (plus its plugin cache, first run only) starts
+        # on a background thread while the window is built
+        self.player = PlaybackService(vlc_dir=vlc_dir, warm_plugin_cache=True)
         self.title(APP_NAME)
         self.geometry(INIT_GEOMETRY)
         self.minsize(INIT_MINISIZE_X, INIT_MINISIZE_Y)
@@ -106,15 +108,26 @@ class MusicGUI(ctk.CTk):
 
         #self.player = PlaybackService()
 
-        # Play queue states used for playing a plylist
-        #playlist queue is a list of filepaths to play
-        self.play_queue: list[Path] = []
-        #Queue index is used to cycle through the queue list
-        #starts at -1 since each call of playlist advances by 1, including first call
-        self.queue_index: int = -1
-        #Shuffle mode is to save state between methods if we should iterate 
-        #sequentially or randomly through playlist queue
-        self.shuffle_mode: bool = False
+        #SQLite catalog (media.db) mirroring music/ and playlists/
+        self.catalog = catalog.get_catalog()
+
+        #Downloads go through the shared scheduler (fixed worker pool, priorities)
+        self.downloads = scheduler.get_scheduler()
+        #Last "play now" job; a newer play request cancels it
+        self._play_job: scheduler.Job | None = None
+
+        # Play queue used for playing a playlist: play order (sequential or
+        #shuffled without repeats), history for "previous", and the upcoming
+        #tracks the prefetcher prepares
+        self.queue: queue_engine.QueueEngine[Path] = queue_engine.QueueEngine()
+        #Downloads / page-cache warms the next few queue tracks
+        self.prefetcher = prefetch.Prefetcher()
+        #The next queue track is preloaded into the player, which switches to it
+        #without a gap and tells us here (from its handoff thread). _play_gen counts
+        #the tracks we started ourselves, so a handoff overtaken by one is ignored
+        self._play_gen = 0
+        self.player.on_track_changed(
+            lambda path: self.ui.post(self._on_gapless_advance, path, self._play_gen))
 
 
         # More states 
@@ -148,24 +161,14 @@ class MusicGUI(ctk.CTk):
 
         # 5) Now it’s safe to wire events; widgets exist
         self._wire_events()
+        self._watch_playlists()
 
         # 6) Start progress loop
         self._start_progress_loop()
 
     # Gradient helper (legacy, I dont think its used anymore)
     def _redraw_top_gradient(self):
-        c = self.top_canvas
-        c.delete("all")
-        w = int(c.winfo_width()); h = int(c.winfo_height())
-        if w <= 0 or h <= 0: return
-        r1, g1, b1 = c.winfo_rgb(ACCENT)
-        r2, g2, b2 = c.winfo_rgb(BG)
-        dr = (r2 - r1) / max(1, h); dg = (g2 - g1) / max(1, h); db = (b2 - b1) / max(1, h)
-        for y in range(h):
-            rr = int(r1 + dr * y) // 256
-            gg = int(g1 + dg * y) // 256
-            bb = int(b1 + db * y) // 256
-            c.create_line(0, y, w, y, fill=f"#{rr:02x}{gg:02x}{bb:02x}")
+        paint_vertical_gradient(self.top_canvas, ACCENT, BG)
 
     # UI creation
     def _configure_grid(self):
@@ -191,33 +194,68 @@ class MusicGUI(ctk.CTk):
         root.mkdir(parents=True, exist_ok=True) 
         return root
 
-    def _list_playlists_fs(self) -> list[str]:
-        root = self._playlists_root()
-        names = [p.name for p in root.iterdir() if p.is_dir()]
-        names.sort(key=str.casefold)
-        return names
+    def _playlists_tracker(self) -> change_tracker.DirectoryTracker:
+        return change_tracker.tracker_for(self._playlists_root(), kind="dirs")
+
+    #Playlist names come from the catalog (one indexed query), the tracker
+    #poll is a single stat() unless the playlists folder changed
+    def _list_playlists(self) -> list[str]:
+        self._playlists_tracker().poll()
+        return self.catalog.list_playlists()
+
+    #Playlist folders created/deleted outside the app (or by us) reach the
+    #catalog through the change tracker; the catalog then tells us, and the
+    #sidebar / playlist list are patched instead of rebuilt
+    def _watch_playlists(self):
+        self.catalog.subscribe(self._on_catalog_change)
+        change_tracker.start_watching()
+
+    # Called on the thread that wrote to the catalog; hop onto the Tk thread,
+    # once per burst of changes
+    def _on_catalog_change(self, change: catalog.CatalogChange):
+        if change.playlists and not self._playlists_refresh_pending:
+            self._playlists_refresh_pending = True
+            self.ui.post(self._on_playlists_changed)
+
+    def _on_playlists_changed(self):
+        self._playlists_refresh_pending = False
+        names = self.catalog.list_playlists()
+        self.refresh_playlists_sidebar(names)
+        page = self.pages.get("make playlist")
+        if page is not None:
+            page.refresh_list(names)
 
     #Refreshes playlist sidebar so that when a
-    #new playlist is made it showes up in the sidebar menue
-    def refresh_playlists_sidebar(self):
-        for w in self.playlists_container.winfo_children():
-            w.destroy()
-
-        names = self._list_playlists_fs()
-        if not names:
-            lbl = ctk.CTkLabel(self.playlists_container, text="(no playlists yet)", text_color=TEXT_MUTED)
-            lbl.pack(fill="x", padx=8, pady=(4, 8))
-            return
-
-        for name in names:
-            b = ctk.CTkButton(
-                self.playlists_container,
-                text=name,
-                command=lambda n=name: self.show_playlist(n),
-                fg_color=CARD_BG, hover_color="#242424",
-                text_color=TEXT, corner_radius=12, height=36
-            )
+    #new playlist is made it showes up in the sidebar menue.
+    #Only the buttons of playlists that came, went or moved are touched
+    def refresh_playlists_sidebar(self, names: list[str] | None = None):
+        if names is None:
+            names = self._list_playlists()
+        self._sidebar.update(names)
+
+        if names:
+            self._sidebar_empty.pack_forget()
+        elif not self._sidebar_empty.winfo_manager():
+            self._sidebar_empty.pack(fill="x", padx=8, pady=(4, 8))
+
+    def _sidebar_insert(self, index: int, name: str):
+        b = ctk.CTkButton(
+            self.playlists_container,
+            text=name,
+            command=lambda n=name: self.show_playlist(n),
+            fg_color=CARD_BG, hover_color="#242424",
+            text_color=TEXT, corner_radius=12, height=36
+        )
+        # keys[index] is the button this one goes in front of (none: at the end)
+        keys = self._sidebar.keys
+        if index < len(keys):
+            b.pack(fill="x", padx=8, pady=4, before=self._sidebar_buttons[keys[index]])
+        else:
             b.pack(fill="x", padx=8, pady=4)
+        self._sidebar_buttons[name] = b
+
+    def _sidebar_remove(self, index: int, name: str):
+        self._sidebar_buttons.pop(name).destroy()
 
     #Helps display the songs inside of a playlist
     #does this by going through the playlist and displaying all the filenames
@@ -239,64 +277,70 @@ class MusicGUI(ctk.CTk):
     def _play_path(self, path: Path):
         """Start playback of a single file."""
         self.current_path = path
+        self._play_gen += 1
         self.player.stop()
         self.player.play(path)
         self.playing = True
         self.pause_btn.configure(text="Pause")
         self.set_status(f"Playing: {path.name}")
+        self._kick_repaint()
+
+    def _prefetch_upcoming(self):
+        upcoming = self.queue.peek(self.prefetcher.ahead)
+        self.prefetcher.update(upcoming)
+        if upcoming:
+            self.player.preload(upcoming[0])
+
+    def _on_gapless_advance(self, path: Path, gen: int):
+        """The player moved on to the preloaded track by itself: catch the queue up."""
+        if gen != self._play_gen:
+            # we started another track since (a skip raced this callback)
+            return
+        # the preload was peek(1) at the time; only then is it the queue's next
+        # entry. If the queue changed since, the track playing wins: it becomes
+        # the current entry and the queue moves on from there
+        upcoming = self.queue.peek(1)
+        if upcoming and upcoming[0] == path:
+            self.queue.next()
+        elif self.queue.current != path:
+            self.queue.play_now(path)
+        self.current_path = path
+        self.playing = True
+        self.pause_btn.configure(text="Pause")
+        self.set_status(f"Playing: {path.name}")
+        self._kick_repaint()
+        self._prefetch_upcoming()
 
     def _advance_queue(self):
-        if not self.play_queue:
+        if not len(self.queue):
             return
 
-        if getattr(self, "shuffle_mode", False):
-            # pick a random index; avoid immediate repeat if >1 track
-            if len(self.play_queue) > 1 and 0 <= self.queue_index < len(self.play_queue):
-                prev = self.queue_index
-                while True:
-                    idx = random.randrange(len(self.play_queue))
-                    if idx != prev:
-                        break
-                self.queue_index = idx
-            else:
-                self.queue_index = random.randrange(len(self.play_queue))
-        else:
-            self.queue_index += 1
-            if self.queue_index >= len(self.play_queue):
-                if getattr(self, "loop_list", True):
-                    self.queue_index = 0
-                    self.set_status("Queue reset.")
-                else:
-                    self.playing = False
-                    self.current_path = None
-                    self.set_status("Playlist finished.")
-                    return
-
-        self._play_path(self.play_queue[self.queue_index])
+        nxt = self.queue.next()
+        if nxt is None:
+            self.playing = False
+            self.current_path = None
+            self.set_status("Playlist finished.")
+            return
+        self._play_path(nxt)
+        self._prefetch_upcoming()
 
     def start_playlist_folder(self, folder: Path, shuffle_list=False, loop_list=True):
-        """Build queue from a folder and start playing."""
-        if not folder.exists() or not folder.is_dir():
+        """Build queue from a playlist folder (via the catalog) and start playing."""
+        if not folder.is_dir():
             messagebox.showerror("Fluss", f"Folder not found:\n{folder}")
             return
 
-        # collect playable files 
+        # collect playable files, in playlist order
         exts = {".mp3", ".m4a", ".mp4", ".webm", ".opus", ".wav", ".flac"}
-        files = sorted(
-            [p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in exts],
-            key=lambda p: p.name.casefold()
-        )
+        change_tracker.tracker_for(folder).poll()
+        files = [p for p in self.catalog.playlist_tracks(folder.name) if p.suffix.lower() in exts]
         if not files:
             messagebox.showinfo("Fluss", "No audio files in that playlist folder.")
             return
 
-        # load the queue and reset position
-        self.play_queue = files
-        self.queue_index = -1
-
-        # remember modes
-        self.shuffle_mode = bool(shuffle_list)
-        self.loop_list   = bool(loop_list)
+        # load the queue (and modes); order and history start over
+        self.queue.reset(files, shuffle=bool(shuffle_list), loop=bool(loop_list))
+        self._index_queue(files)
 
         # kick off first track
         self._advance_queue()
@@ -304,6 +348,53 @@ class MusicGUI(ctk.CTk):
 
 
 
+    # Queue entries are tagged with their folder (pure path arithmetic, done
+    # here) and their (st_dev, st_ino) (stat'ed on a worker), so deleting
+    # files or playlists drops them from the queue by key, in time
+    # proportional to what was removed and without filesystem calls on the
+    # UI thread. Playlist files are hardlinks of music/ ones, so an inode key
+    # is only dropped once its last link is deleted
+    @staticmethod
+    def _folder_key(folder: Path) -> tuple:
+        return ("dir", folder)
+
+    @staticmethod
+    def _inode_key(st: os.stat_result) -> tuple:
+        return ("inode", st.st_dev, st.st_ino)
+
+    @classmethod
+    def _file_key(cls, path: Path) -> tuple | None:
+        # on a worker thread only
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return cls._inode_key(st)
+
+    def _index_queue(self, files: list[Path]):
+        for p in files:
+            self.queue.tag(p, self._folder_key(p.parent))
+
+        def worker():
+            keys = [(p, self._file_key(p)) for p in files]
+            self.ui.post(self._tag_queue, keys)
+
+        threading.Thread(target=worker, name="queue-index", daemon=True).start()
+
+    def _tag_queue(self, keys: list[tuple[Path, tuple | None]]):
+        # tag() skips entries the queue dropped (or was reset) in the meantime
+        for p, key in keys:
+            if key is not None:
+                self.queue.tag(p, key)
+
+    def drop_from_queue(self, paths=(), keys=()) -> int:
+        """Remove tracks (by path and/or tag key) from the play queue; returns entries removed."""
+        removed = sum(self.queue.remove(p) for p in paths)
+        removed += sum(self.queue.remove_key(k) for k in keys)
+        if removed:
+            self._prefetch_upcoming()
+        return removed
+
     # --------- Page container + pages (router) ----------
     def _build_pages_container(self):
         self.page_container = ctk.CTkFrame(self, fg_color=BG)
@@ -388,6 +479,12 @@ class MusicGUI(ctk.CTk):
         # --- Dynamic playlist buttons container ---
         self.playlists_container = ctk.CTkFrame(self.menu_frame, fg_color="transparent")
         self.playlists_container.grid(row=2, column=0, sticky="nsew", padx=4, pady=(0, 8))
+        #One button per playlist, kept in step with the catalog by a keyed reconciler
+        self._sidebar_buttons: dict[str, ctk.CTkButton] = {}
+        self._sidebar = reconcile.KeyedReconciler(self._sidebar_insert, self._sidebar_remove)
+        self._sidebar_empty = ctk.CTkLabel(self.playlists_container, text="(no playlists yet)",
+                                           text_color=TEXT_MUTED)
+        self._playlists_refresh_pending = False
 
         # build initial list
         self.refresh_playlists_sidebar()
@@ -469,9 +566,13 @@ class MusicGUI(ctk.CTk):
         self.seek.bind("<ButtonPress-1>", lambda e: self._set_dragging(True))
         self.seek.bind("<ButtonRelease-1>", lambda e: self._seek_release())
 
+    #Safe from any thread: goes through the dispatch queue, and of several
+    #updates within one frame only the last is drawn
     def set_status(self, text: str):
+        self.ui.post_coalesced("status", self._show_status, text)
+
+    def _show_status(self, text: str):
         self.status.configure(text=text)
-        self.status.update_idletasks()
 
     def _set_dragging(self, v: bool):
         self.user_dragging = v
@@ -487,6 +588,7 @@ class MusicGUI(ctk.CTk):
         cur, tot = self.player.get_position()
         if tot > 0:
             self.player.seek(tot * (max(0.0, min(100.0, percent)) / 100.0))
+            self._kick_repaint()
 
     def download_query(self, query: str):
         if not query:
@@ -504,17 +606,19 @@ class MusicGUI(ctk.CTk):
                 self.current_path = Path(path)
                 self.set_status(f"Downloaded: {self.current_path.name}")
 
+            except scheduler.Cancelled:
+                self.set_status("Cancelled.")
             except Exception as e:
                 err = "".join(traceback.format_exception_only(type(e), e)).strip()
                 print(traceback.format_exc())
-                self.after(0, lambda: (
+                self.ui.post(lambda: (
                     self.set_status("Error. See console for details."),
                     messagebox.showerror("LocalStream Error", err)
                 ))
             finally:
-                self.after(0, self._enable_controls)
+                self.ui.post(self._enable_controls)
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.downloads.submit(worker, priority=scheduler.ADD_TO_PLAYLIST, label=query)
 
     def add_query_to_paylist(self, query: str, playlist: str, play_song  = False):
         if not query:
@@ -534,24 +638,27 @@ class MusicGUI(ctk.CTk):
                     self.player.stop()
                     self.player.play(self.current_path)
                     self.playing = True
-                    self.after(0, lambda: (
+                    self.ui.post(lambda: (
                         self.set_status(f"Playing: {self.current_path.name}"),
-                        self.pause_btn.configure(text="Pause")
+                        self.pause_btn.configure(text="Pause"),
+                        self._kick_repaint()
                     ))
                 else:
                     self.set_status(f"Downloaded: {self.current_path.name}")
 
+            except scheduler.Cancelled:
+                self.set_status("Cancelled.")
             except Exception as e:
                 err = "".join(traceback.format_exception_only(type(e), e)).strip()
                 print(traceback.format_exc())
-                self.after(0, lambda: (
+                self.ui.post(lambda: (
                     self.set_status("Error. See console for details."),
                     messagebox.showerror("LocalStream Error", err)
                 ))
             finally:
-                self.after(0, self._enable_controls)
+                self.ui.post(self._enable_controls)
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.downloads.submit(worker, priority=scheduler.ADD_TO_PLAYLIST, label=query)
 
     #  reusable play method (SearchPage calls this)
     def play_query(self, query: str):
@@ -564,29 +671,40 @@ class MusicGUI(ctk.CTk):
 
         def worker():
             try:
-                path = search.find_or_download(query)
+                # progressive: a download comes back once a few seconds are
+                # buffered and keeps going while it plays
+                path = search.find_or_download(query, progressive=True)
                 if path is None:
                     raise RuntimeError("Could not resolve a file for that query.")
+                # a newer play request may have arrived while this one resolved
+                scheduler.check_cancelled()
                 self.current_path = Path(path)
 
                 self.player.stop()
-                self.player.play(self.current_path)
+                self.player.play(path)
                 self.playing = True
-                self.after(0, lambda: (
+                self.ui.post(lambda: (
                     self.set_status(f"Playing: {self.current_path.name}"),
-                    self.pause_btn.configure(text="Pause")
+                    self.pause_btn.configure(text="Pause"),
+                    self._kick_repaint()
                 ))
+            except scheduler.Cancelled:
+                self.set_status("Cancelled.")
             except Exception as e:
                 err = "".join(traceback.format_exception_only(type(e), e)).strip()
                 print(traceback.format_exc())
-                self.after(0, lambda: (
+                self.ui.post(lambda: (
                     self.set_status("Error. See console for details."),
                     messagebox.showerror("LocalStream Error", err)
                 ))
             finally:
-                self.after(0, self._enable_controls)
+                self.ui.post(self._enable_controls)
 
-        threading.Thread(target=worker, daemon=True).start()
+        # Only the latest play request matters: drop the previous one if it is
+        # still waiting or downloading
+        if self._play_job is not None and not self._play_job.done():
+            self._play_job.cancel()
+        self._play_job = self.downloads.submit(worker, priority=scheduler.PLAY_NOW, label=query)
 
     def on_pause_resume(self):
         if self.playing:
@@ -599,6 +717,7 @@ class MusicGUI(ctk.CTk):
             self.playing = True
             self.pause_btn.configure(text="Pause")
             self.set_status("Playing…")
+            self._kick_repaint()
 
     def skip_song(self):
         if not self.playing:
@@ -615,6 +734,7 @@ class MusicGUI(ctk.CTk):
         self.pause_btn.configure(text="Pause")
         self.set_status("Stopped.")
         self.current_path = None
+        self._kick_repaint()
 
     def _on_finished(self):
         self.after(0, lambda: (
@@ -626,27 +746,57 @@ class MusicGUI(ctk.CTk):
         self.current_path = None
 
     # ---------- Progress Loop ----------
+    # Track changes come from PlaybackService's EndReached (via on_finished) and
+    # the position from its event-fed cache, so this loop only repaints: at the
+    # rate the clock / seek bar actually change, and not at all while paused,
+    # stopped or minimized (_kick_repaint wakes it up again)
     def _start_progress_loop(self):
-        def tick():
-            try:
-                cur, tot = self.player.get_position()
-                self.time_cur.configure(text=self._fmt_time(cur))
-                self.time_tot.configure(text=self._fmt_time(tot))
-                if not self.user_dragging and tot > 0:
-                    pct = (cur / tot) * 100.0
-                    self.seek_var.set(max(0.0, min(100.0, pct)))
-            finally:
-                self.after(200, tick)
+        self._repaint_job = None
+        self._shown_times = ("", "")
+        self.player.on_finished(lambda: self.ui.post(self._on_track_end))
+        self.bind("<Map>", self._on_window_mapped)
+        self._kick_repaint()
+
+    def _kick_repaint(self):
+        if self._repaint_job is None:
+            self._repaint_job = self.after(0, self._repaint)
+
+    def _on_window_mapped(self, event):
+        # <Map> bubbles up from every child; only the window being restored counts
+        if event.widget is self:
+            self._kick_repaint()
+
+    def _repaint(self):
+        self._repaint_job = None
+        cur, tot = self.player.get_position()
+        times = (self._fmt_time(cur), self._fmt_time(tot))
+        if times != self._shown_times:
+            self._shown_times = times
+            self.time_cur.configure(text=times[0])
+            self.time_tot.configure(text=times[1])
+        if not self.user_dragging and tot > 0:
+            pct = (cur / tot) * 100.0
+            self.seek_var.set(max(0.0, min(100.0, pct)))
+        if not self.playing or self.state() == "iconic":
+            return
+        self._repaint_job = self.after(self._repaint_delay(cur, tot), self._repaint)
 
-                try:
-                    if self.playing and tot > 0 and (tot - cur) <= 0.8:
-                        # small hysteresis: only advance once per track
-                        # stop current, mark not playing, then advance
-                        self.playing = False
-                        self._advance_queue()
-                except Exception:
-                    pass
-        tick()
+    @staticmethod
+    def _repaint_delay(cur: float, tot: float) -> int:
+        # next change of the clock, or one step of the seek bar (~1/500 of the
+        # track), whichever comes first; in ms
+        to_next_second = 1.0 - (cur % 1.0)
+        bar_step = tot / 500.0 if tot > 0 else 1.0
+        return int(max(0.1, min(1.0, to_next_second, bar_step)) * 1000)
+
+    def _on_track_end(self):
+        """EndReached, on the UI thread: the one place a finished track advances the queue."""
+        self.playing = False
+        if len(self.queue):
+            self._advance_queue()
+        else:
+            self._on_finished()
+        self._kick_repaint()
 
     @staticmethod
     def _fmt_time(seconds: float) -> str:
@@ -709,26 +859,12 @@ class SearchPage(Page):
         self._title_text = "Search"
         self.title_item = None  # canvas item id (int) or None
 
-        def _paint(_evt=None):
+        # the shared renderer repaints the gradient (debounced on resize),
+        # then this places the title above it
+        def _paint(w, h):
             c = self.grad_canvas
-            w, h = int(c.winfo_width()), int(c.winfo_height())
-            if w <= 0 or h <= 0:
-                return
 
-            # 1) redraw gradient ONLY, written this way to preserve text above grad
-            c.delete("grad") 
-            r1, g1, b1 = c.winfo_rgb(ACCENT)
-            r2, g2, b2 = c.winfo_rgb(BG)
-            dr = (r2 - r1) / max(1, h)
-            dg = (g2 - g1) / max(1, h)
-            db = (b2 - b1) / max(1, h)
-            for y in range(h):
-                rr = int(r1 + dr*y) // 256
-                gg = int(g1 + dg*y) // 256
-                bb = int(b1 + db*y) // 256
-                c.create_line(0, y, w, y, fill=f"#{rr:02x}{gg:02x}{bb:02x}", tags=("grad",))
-
-            # 2) ensure title exists, using the CURRENT title text
+            # ensure title exists, using the CURRENT title text
             y = max(10, min(h - 10, int(h * 0.6)))
             x = 12
             if self.title_item is None:
@@ -741,7 +877,7 @@ class SearchPage(Page):
                 c.coords(self.title_item, x, y)
                 c.tag_raise(self.title_item)
 
-        self.grad_canvas.bind("<Configure>", _paint)
+        gradient.get_renderer().attach(self.grad_canvas, ACCENT, BG, on_paint=_paint)
         # --- Row 1: three content columns; we only *use* the center one now ---
         left_col  = ctk.CTkFrame(self, fg_color=BG)
         mid_col   = ctk.CTkFrame(self, fg_color=BG)
@@ -840,24 +976,9 @@ class MakePlayList(Page):
         self._title_text = "Manage Playlists"
         self.title_item = None
 
-        def _paint(_evt=None):
+        def _paint(w, h):
             c = self.grad_canvas
-            w, h = int(c.winfo_width()), int(c.winfo_height())
-            if w <= 0 or h <= 0:
-                return
-            # gradient only
-            c.delete("grad")
-            r1, g1, b1 = c.winfo_rgb(ACCENT)
-            r2, g2, b2 = c.winfo_rgb(BG)
-            dr = (r2 - r1) / max(1, h)
-            dg = (g2 - g1) / max(1, h)
-            db = (b2 - b1) / max(1, h)
-            for y in range(h):
-                rr = int(r1 + dr*y) // 256
-                gg = int(g1 + dg*y) // 256
-                bb = int(b1 + db*y) // 256
-                c.create_line(0, y, w, y, fill=f"#{rr:02x}{gg:02x}{bb:02x}", tags=("grad",))
-            # title (center-ish vertically)
+            # title (center-ish vertically), above the shared gradient image
             y = max(10, min(h - 10, int(h * 0.6)))
             if self.title_item is None:
                 self.title_item = c.create_text(
@@ -868,7 +989,7 @@ class MakePlayList(Page):
                 c.coords(self.title_item, 12, y)
                 c.tag_raise(self.title_item)
 
-        self.grad_canvas.bind("<Configure>", _paint)
+        gradient.get_renderer().attach(self.grad_canvas, ACCENT, BG, on_paint=_paint)
 
         # --- Row 1: create form (entry + button) ---
         form = ctk.CTkFrame(self, fg_color=BG)
@@ -914,6 +1035,13 @@ class MakePlayList(Page):
         sb.grid(row=0, column=1, sticky="ns")
         self.pl_listbox.config(yscrollcommand=sb.set)
 
+        # Rows follow the catalog's playlist names through a keyed reconciler
+        self._rows = reconcile.KeyedReconciler(
+            insert=lambda i, name: self.pl_listbox.insert(i, name),
+            remove=lambda i, _name: self.pl_listbox.delete(i),
+        )
+        self._placeholder = False
+
         # Bind delete/backspace and double-click to open
         self.pl_listbox.bind("<Delete>", lambda _e: self._delete_selected_playlists())
         self.pl_listbox.bind("<BackSpace>", lambda _e: self._delete_selected_playlists())
@@ -932,20 +1060,21 @@ class MakePlayList(Page):
         cleaned = cleaned.strip().rstrip(".")
         return cleaned
 
-    def refresh_list(self):
-        """Reload the list of playlist folders."""
-        root = self._playlists_root()
-        root.mkdir(parents=True, exist_ok=True)
-        self.pl_listbox.delete(0, tk.END)
-
-        names = sorted([p.name for p in root.iterdir() if p.is_dir()], key=str.casefold)
+    def refresh_list(self, names: list[str] | None = None):
+        """Bring the list of playlist folders up to date, editing only the rows that changed."""
+        if names is None:
+            names = self.app._list_playlists()
+
+        lb = self.pl_listbox
+        lb.configure(state="normal")
+        if self._placeholder:
+            lb.delete(0)
+            self._placeholder = False
+        self._rows.update(names)
         if not names:
-            self.pl_listbox.insert(tk.END, "(no playlists)")
-            self.pl_listbox.configure(state="disabled")
-        else:
-            self.pl_listbox.configure(state="normal")
-            for n in names:
-                self.pl_listbox.insert(tk.END, n)
+            lb.insert(tk.END, "(no playlists)")
+            lb.configure(state="disabled")
+            self._placeholder = True
 
     # -------- actions --------
     def _create_playlist(self):
@@ -977,9 +1106,8 @@ class MakePlayList(Page):
             return
 
         self.name_entry.delete(0, tk.END)
-        self.refresh_list()
-        if hasattr(self.app, "refresh_playlists_sidebar"):
-            self.app.refresh_playlists_sidebar()
+        # the tracker picks the new folder up and the catalog notifies the views
+        self.app._playlists_tracker().poll()
 
     def _delete_selected_playlists(self):
         """Delete selected playlist folders (with confirmation)."""
@@ -998,37 +1126,36 @@ class MakePlayList(Page):
             return
 
         root = self._playlists_root()
-        errors = []
-        import shutil
+        folders = [root / name for name in names]
 
-        for name in names:
-            folder = root / name
-            try:
-                # If current play queue comes from this folder, stop playback and clear queue
-                if getattr(self.app, "play_queue", None):
-                    # Remove any queued items from this folder
-                    self.app.play_queue = [p for p in self.app.play_queue if p.resolve().parent != folder.resolve()]
-                    if getattr(self.app, "queue_index", -1) >= len(self.app.play_queue):
-                        self.app.queue_index = len(self.app.play_queue) - 1
-                # If currently playing file is inside the folder, stop
-                cur = getattr(self.app, "current_path", None)
-                if cur and cur.resolve().parents and folder.resolve() in cur.resolve().parents:
-                    self.app.on_stop_clicked()
-
-                # Delete the folder (even if not empty)
-                if folder.exists() and folder.is_dir():
-                    shutil.rmtree(folder)
-            except Exception as e:
-                errors.append(f"{name}: {e}")
+        # Drop their tracks from the play queue; stop if one of them is playing
+        self.app.drop_from_queue(keys=[self.app._folder_key(f) for f in folders])
+        cur = getattr(self.app, "current_path", None)
+        if cur is not None and cur.parent in folders:
+            self.app.on_stop_clicked()
+
+        def worker():
+            import shutil
+            errors = []
+            for name, folder in zip(names, folders):
+                try:
+                    # Delete the folder (even if not empty)
+                    if folder.is_dir():
+                        shutil.rmtree(folder)
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+            self.app.ui.post(self._on_playlists_deleted, errors)
+
+        threading.Thread(target=worker, name="delete-playlists", daemon=True).start()
 
+    def _on_playlists_deleted(self, errors: list[str]):
         if errors:
             messagebox.showerror("Delete", "Some playlists could not be deleted:\n" + "\n".join(errors))
         else:
             messagebox.showinfo("Delete", "Deleted.")
 
-        self.refresh_list()
-        if hasattr(self.app, "refresh_playlists_sidebar"):
-            self.app.refresh_playlists_sidebar()
+        # the tracker sees the folders gone and the catalog notifies the views
+        self.app._playlists_tracker().poll()
 
     def _open_selected_playlist(self, _e=None):
         """Double-click behavior: open the selected playlist page."""
@@ -1092,7 +1219,10 @@ class PlaylistViewPage(Page):
             messagebox.showinfo("Delete", "Select one or more files to delete.")
             return
 
-        names = [self.listbox.get(i) for i in sel]
+        # rows still loading have no name yet
+        names = [n for n in (self.listbox.get(i) for i in sel) if n]
+        if not names:
+            return
         if not messagebox.askyesno(
             "Delete",
             f"Delete {len(names)} file(s) from '{self.current_playlist}'?"
@@ -1102,40 +1232,43 @@ class PlaylistViewPage(Page):
         folder = self.app._playlists_root() / self.current_playlist
         targets = [(folder / n) for n in names]
 
-        # If the currently playing track is among the targets, stop or skip
+        # If the currently playing track is among the targets, stop
         cur = getattr(self.app, "current_path", None)
-        deleting_current = cur and any(t.samefile(cur) if t.exists() and cur.exists() else (t == cur)
-                                    for t in targets)
-
-        if deleting_current:
-            # simple behavior: stop. Or call self.app._advance_queue() if you prefer skip.
+        if cur is not None and cur in targets:
             self.app.on_stop_clicked()
 
-        # Remove from play_queue if it came from the same playlist
-        if getattr(self.app, "play_queue", None):
-            keep = []
-            for p in self.app.play_queue:
+        # Remove from the play queue: by path right away, then (once the worker
+        # has stat'ed them) by inode, for symlinks to the same files queued
+        # under another path
+        self.app.drop_from_queue(paths=targets)
+
+        def worker():
+            # inode key -> [links it had, links deleted here]: files are
+            # hardlinked between music/ and playlists, and an inode only goes
+            # away (taking its queued aliases with it) with its last link
+            links, errors = {}, []
+            for t in targets:
+                try:
+                    st = os.lstat(t)
+                except OSError:
+                    st = None
+                # Delete files (permanent)
                 try:
-                    in_targets = any(t == p or (t.exists() and p.exists() and t.samefile(p)) for t in targets)
-                except Exception:
-                    in_targets = any(t == p for t in targets)
-                if not in_targets:
-                    keep.append(p)
-            self.app.play_queue = keep
-
-            # fix queue_index if it points past the end
-            if self.app.queue_index >= len(self.app.play_queue):
-                self.app.queue_index = len(self.app.play_queue) - 1
-
-        # Delete files (permanent)
-        import os
-        errors = []
-        for t in targets:
-            try:
-                if t.exists():
                     os.remove(t)
-            except Exception as e:
-                errors.append(f"{t.name}: {e}")
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    errors.append(f"{t.name}: {e}")
+                    continue
+                if st is not None and stat.S_ISREG(st.st_mode):
+                    links.setdefault(self.app._inode_key(st), [st.st_nlink, 0])[1] += 1
+            keys = [key for key, (nlink, deleted) in links.items() if deleted >= nlink]
+            self.app.ui.post(self._on_files_deleted, keys, errors)
+
+        threading.Thread(target=worker, name="delete-files", daemon=True).start()
+
+    def _on_files_deleted(self, keys: list[tuple], errors: list[str]):
+        self.app.drop_from_queue(keys=keys)
 
         if errors:
             messagebox.showerror("Delete", "Some files could not be deleted:\n" + "\n".join(errors))
@@ -1151,6 +1284,12 @@ class PlaylistViewPage(Page):
         super().__init__(parent, **kwargs)
         self.app = app
         self.current_playlist: str | None = None
+        #The list shows the playlist's file names, paged in from the catalog in the
+        #background and then kept in sync with the folder tracker
+        self._tracker: change_tracker.DirectoryTracker | None = None
+        self._loader: virtual_list.PagedLoader | None = None
+        #Bumped per load_playlist call so a stale background load is ignored
+        self._load_gen = 0
 
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
@@ -1176,26 +1315,11 @@ class PlaylistViewPage(Page):
         self._title_text = "Playlist"
         self.title_item = None  # canvas item id (int) or None
 
-        def _paint(_evt=None):
+        # gradient comes from the shared renderer; this only keeps the title placed
+        def _paint(w, h):
             c = self.grad_canvas
-            w, h = int(c.winfo_width()), int(c.winfo_height())
-            if w <= 0 or h <= 0:
-                return
 
-            # 1) redraw gradient ONLY (don't nuke the text)
-            c.delete("grad")
-            r1, g1, b1 = c.winfo_rgb(ACCENT)
-            r2, g2, b2 = c.winfo_rgb(BG)
-            dr = (r2 - r1) / max(1, h)
-            dg = (g2 - g1) / max(1, h)
-            db = (b2 - b1) / max(1, h)
-            for y in range(h):
-                rr = int(r1 + dr*y) // 256
-                gg = int(g1 + dg*y) // 256
-                bb = int(b1 + db*y) // 256
-                c.create_line(0, y, w, y, fill=f"#{rr:02x}{gg:02x}{bb:02x}", tags=("grad",))
-
-            # 2) ensure title exists, using the CURRENT title text
+            # ensure title exists, using the CURRENT title text
             # place roughly centered vertically (h*0.5) and with 12px left margin
             y = max(10, min(h - 10, int(h * 0.6)))
             x = 12
@@ -1209,7 +1333,7 @@ class PlaylistViewPage(Page):
                 c.coords(self.title_item, 12, y)
                 c.tag_raise(self.title_item)
 
-        self.grad_canvas.bind("<Configure>", _paint)
+        gradient.get_renderer().attach(self.grad_canvas, ACCENT, BG, on_paint=_paint)
 
 
         self.title_item = self.grad_canvas.create_text(
@@ -1295,9 +1419,10 @@ class PlaylistViewPage(Page):
         list_frame.grid_columnconfigure(0, weight=1)
         list_frame.grid_rowconfigure(0, weight=1)
 
-        self.listbox = tk.Listbox(
+        # only the rows in view are drawn, so huge playlists open instantly
+        self.listbox = virtual_list.VirtualList(
             list_frame, bg=BG, fg=TEXT, font=(FONT, 30, "bold"), selectbackground="#333333",
-            highlightthickness=0, bd=0, activestyle="none"
+            highlightthickness=0, bd=0
         )
         self.listbox.grid(row=1, column=0, sticky="nsew")
 
@@ -1309,23 +1434,74 @@ class PlaylistViewPage(Page):
         self.current_playlist = name
         self.grad_canvas.itemconfigure(self.title_item, text=f"Playlist — {name}")
 
-        folder = self.app._playlists_root() / name
-        self.listbox.delete(0, tk.END)
-
-        if not folder.exists() or not folder.is_dir():
-            self.listbox.insert(tk.END, "(missing playlist folder)")
-            return
+        # stop following the old folder / loading the old list
+        if self._tracker is not None:
+            self._tracker.unsubscribe(self._on_folder_changes)
+            self._tracker = None
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader = None
+        self.listbox.reset()
+        self.listbox.set_message("Loading…")
+        self._load_gen += 1
+        gen = self._load_gen
+
+        # folder check, tracker poll and row count off the UI thread
+        def worker():
+            folder = self.app._playlists_root() / name
+            if not folder.is_dir():
+                self.app.ui.post(lambda: gen == self._load_gen and
+                                 self.listbox.set_message("(missing playlist folder)"))
+                return
+            tracker = change_tracker.tracker_for(folder)
+            tracker.poll()
+            total = self.app.catalog.playlist_size(name)
+            self.app.ui.post(self._start_loading, gen, name, tracker, total)
 
-        # list files (you can filter by extension if you want)
-        files = [p for p in folder.iterdir() if p.is_file()]
-        files.sort(key=lambda p: p.name.casefold())
+        threading.Thread(target=worker, name="playlist-load", daemon=True).start()
 
-        if not files:
-            self.listbox.insert(tk.END, "(no files)")
+    def _start_loading(self, gen: int, name: str, tracker, total: int):
+        if gen != self._load_gen:
+            return
+        # follow this folder's changes from now on
+        self._tracker = tracker
+        self._tracker.subscribe(self._on_folder_changes)
+
+        # file names in playlist order, straight from the catalog, a page at a time
+        self.listbox.reset(total)
+        self.listbox.set_message(None if total else "(no files)")
+        fetch = lambda offset, limit: [p.name for p in self.app.catalog.playlist_page(name, offset, limit)]
+        self._loader = virtual_list.PagedLoader(self.listbox, total, fetch, self.app.ui.post)
+
+    # Called from the tracker thread; hop onto the Tk thread
+    def _on_folder_changes(self, changes):
+        self.app.ui.post(self._apply_changes, changes)
+
+    def _apply_changes(self, changes):
+        """Patch only the rows that changed instead of reloading the list."""
+        if self._tracker is None or changes.directory != self._tracker.directory:
+            return
+        if self._loader is not None and not self._loader.complete:
+            # rows are still paging in by position; start over from the (updated) catalog
+            self.load_playlist(self.current_playlist)
             return
 
-        for f in files:
-            self.listbox.insert(tk.END, f.name)
+        lb = self.listbox
+        for p in changes.removed:
+            i = lb.index_of(p.name)
+            if i is not None:
+                lb.delete(i)
+        for old, new in changes.renamed:
+            i = lb.index_of(old.name)
+            if i is not None:
+                lb.delete(i)
+                lb.insert(i, new.name)
+        # new files are appended to the playlist, same as in the catalog
+        for p in changes.added:
+            if lb.index_of(p.name) is None:
+                lb.insert(tk.END, p.name)
+
+        lb.set_message(None if lb.size() else "(no files)")
 
 
 
@@ -0,0 +1,538 @@
+# catalog.py
+"""
+SQLite catalog (media.db) mirroring music/ and playlists/<name>/.
+
+Tables (schema already shipped in media.db):
+  tracks(id, path, title, artist, duration)
+  playlists(id, name, created_at)
+  playlist_tracks(playlist_id, track_id, position, added_at)
+
+The files stay the source of truth; the catalog follows them:
+- at startup only folders whose mtime differs from the stored one are re-listed
+- afterwards change_tracker deltas are applied as they arrive
+so listing playlists, a playlist's contents or building a queue is one
+indexed query instead of a directory walk.
+
+resolve_cache maps a normalized search query to the video id it resolved to
+(TTL + LRU bounded) and video_files maps a video id to the local file, so a
+repeated query needs no network round trip at all.
+
+Subscribers (subscribe()) get a CatalogChange after each write batch that
+touched playlists or tracks, so views can patch themselves from the catalog
+instead of rescanning folders.
+
+tracks_fts is an FTS5 index over title / artist / file name, maintained by
+triggers on tracks; search() answers ranked (bm25) top-k queries from it.
+
+One connection in WAL mode, shared behind a lock; every write batch runs in a
+single transaction, and all SQL is module-level constants so sqlite3's
+statement cache keeps them prepared.
+"""
+
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import change_tracker
+import notify
+from library_index import AUDIO_EXTS
+
+ROOT = Path(__file__).resolve().parent
+DB_PATH = ROOT / "media.db"
+MUSIC_DIR = ROOT / "music"
+PLAYLISTS_DIR = ROOT / "playlists"
+
+# query -> video id resolutions: search results drift, so they expire
+RESOLVE_TTL = 30 * 24 * 3600
+# ... and only the most recently used ones are kept
+RESOLVE_MAX_ENTRIES = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE,
+  created_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE TABLE IF NOT EXISTS tracks (
+  id INTEGER PRIMARY KEY,
+  path TEXT NOT NULL UNIQUE,
+  title TEXT,
+  artist TEXT,
+  duration REAL
+);
+CREATE TABLE IF NOT EXISTS playlist_tracks (
+  playlist_id INTEGER NOT NULL,
+  track_id INTEGER NOT NULL,
+  position INTEGER NOT NULL,
+  added_at TEXT NOT NULL DEFAULT (datetime('now')),
+  PRIMARY KEY (playlist_id, track_id),
+  FOREIGN KEY (playlist_id) REFERENCES playlists(id) ON DELETE CASCADE,
+  FOREIGN KEY (track_id)    REFERENCES tracks(id)    ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_playlist_tracks_order
+  ON playlist_tracks(playlist_id, position);
+-- ON DELETE CASCADE from tracks looks rows up by track_id
+CREATE INDEX IF NOT EXISTS idx_playlist_tracks_track
+  ON playlist_tracks(track_id);
+-- last folder mtime the catalog was reconciled against
+CREATE TABLE IF NOT EXISTS folder_state (
+  path TEXT PRIMARY KEY,
+  mtime_ns INTEGER NOT NULL
+);
+-- normalized search query -> video id it resolved to
+CREATE TABLE IF NOT EXISTS resolve_cache (
+  query TEXT PRIMARY KEY,
+  video_id TEXT NOT NULL,
+  resolved_at REAL NOT NULL,
+  last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_resolve_cache_lru
+  ON resolve_cache(last_used);
+-- video id -> downloaded file
+CREATE TABLE IF NOT EXISTS video_files (
+  video_id TEXT PRIMARY KEY,
+  path TEXT NOT NULL
+);
+"""
+
+# base name of a stored path, for either separator style
+_BASENAME = (
+    "replace(replace({p}, '\\', '/'), "
+    "rtrim(replace({p}, '\\', '/'), replace(replace({p}, '\\', '/'), '/', '')), '')"
+)
+
+_FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE tracks_fts USING fts5(
+  title, artist, filename,
+  tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER tracks_fts_ai AFTER INSERT ON tracks BEGIN
+  INSERT INTO tracks_fts(rowid, title, artist, filename)
+  VALUES (new.id, new.title, new.artist, {_BASENAME.format(p="new.path")});
+END;
+CREATE TRIGGER tracks_fts_ad AFTER DELETE ON tracks BEGIN
+  DELETE FROM tracks_fts WHERE rowid = old.id;
+END;
+CREATE TRIGGER tracks_fts_au AFTER UPDATE OF path, title, artist ON tracks BEGIN
+  UPDATE tracks_fts
+     SET title = new.title, artist = new.artist, filename = {_BASENAME.format(p="new.path")}
+   WHERE rowid = new.id;
+END;
+INSERT INTO tracks_fts(rowid, title, artist, filename)
+  SELECT id, title, artist, {_BASENAME.format(p="path")} FROM tracks;
+"""
+
+_SQL_LIST_PLAYLISTS = "SELECT name FROM playlists ORDER BY name COLLATE NOCASE"
+_SQL_PLAYLIST_ID = "SELECT id FROM playlists WHERE name = ?"
+_SQL_ADD_PLAYLIST = "INSERT OR IGNORE INTO playlists(name) VALUES (?)"
+_SQL_DEL_PLAYLIST = "DELETE FROM playlists WHERE name = ?"
+_SQL_RENAME_PLAYLIST = "UPDATE playlists SET name = ? WHERE name = ?"
+_SQL_PLAYLIST_TRACKS = """
+SELECT t.path
+  FROM playlists p
+  JOIN playlist_tracks pt ON pt.playlist_id = p.id
+  JOIN tracks t ON t.id = pt.track_id
+ WHERE p.name = ?
+ ORDER BY pt.position
+"""
+_SQL_PLAYLIST_SIZE = """
+SELECT COUNT(*)
+  FROM playlists p
+  JOIN playlist_tracks pt ON pt.playlist_id = p.id
+ WHERE p.name = ?
+"""
+_SQL_PLAYLIST_PAGE = _SQL_PLAYLIST_TRACKS + " LIMIT ? OFFSET ?"
+_SQL_NEXT_POSITION = "SELECT COALESCE(MAX(position), -1) + 1 FROM playlist_tracks WHERE playlist_id = ?"
+_SQL_FOLDER_TRACKS = "SELECT path, id FROM tracks WHERE path > ? AND path < ?"
+_SQL_ADD_TRACK = "INSERT OR IGNORE INTO tracks(path, title, artist) VALUES (?, ?, ?)"
+_SQL_TRACK_ID = "SELECT id FROM tracks WHERE path = ?"
+_SQL_DEL_TRACK = "DELETE FROM tracks WHERE path = ?"
+_SQL_DEL_FOLDER_TRACKS = "DELETE FROM tracks WHERE path > ? AND path < ?"
+_SQL_MOVE_TRACK = "UPDATE tracks SET path = ?, title = ?, artist = ? WHERE path = ?"
+_SQL_MOVE_FOLDER_TRACKS = "UPDATE tracks SET path = ? || substr(path, ?) WHERE path > ? AND path < ?"
+_SQL_LINK_TRACK = "INSERT OR IGNORE INTO playlist_tracks(playlist_id, track_id, position) VALUES (?, ?, ?)"
+# rows left behind by files that are in no playlist and outside music/
+_SQL_PRUNE_ORPHANS = """
+DELETE FROM tracks
+ WHERE id NOT IN (SELECT track_id FROM playlist_tracks)
+   AND NOT (path > ? AND path < ?)
+"""
+_SQL_FOLDER_MTIME = "SELECT mtime_ns FROM folder_state WHERE path = ?"
+_SQL_SET_FOLDER_MTIME = (
+    "INSERT INTO folder_state(path, mtime_ns) VALUES (?, ?) "
+    "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns"
+)
+_SQL_DEL_FOLDER_MTIME = "DELETE FROM folder_state WHERE path = ?"
+_SQL_CACHE_GET = """
+SELECT r.video_id, r.resolved_at, v.path
+  FROM resolve_cache r
+  LEFT JOIN video_files v ON v.video_id = r.video_id
+ WHERE r.query = ?
+"""
+_SQL_CACHE_TOUCH = "UPDATE resolve_cache SET last_used = ? WHERE query = ?"
+_SQL_CACHE_DEL = "DELETE FROM resolve_cache WHERE query = ?"
+_SQL_CACHE_PUT = (
+    "INSERT INTO resolve_cache(query, video_id, resolved_at, last_used) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(query) DO UPDATE SET video_id = excluded.video_id, "
+    "resolved_at = excluded.resolved_at, last_used = excluded.last_used"
+)
+_SQL_CACHE_EVICT = """
+DELETE FROM resolve_cache
+ WHERE query IN (SELECT query FROM resolve_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)
+"""
+_SQL_VIDEO_GET = "SELECT path FROM video_files WHERE video_id = ?"
+_SQL_VIDEO_PUT = (
+    "INSERT INTO video_files(video_id, path) VALUES (?, ?) "
+    "ON CONFLICT(video_id) DO UPDATE SET path = excluded.path"
+)
+# bm25 column weights: title, artist, filename (lower score = better match).
+# Playlist folders hold every file (cover.jpg, notes.txt...), but only audio
+# may come back as a search hit: callers play or hardlink it
+_AUDIO_ONLY = " OR ".join(f"lower(t.path) LIKE '%{ext}'" for ext in sorted(AUDIO_EXTS))
+_SQL_SEARCH = f"""
+SELECT t.path, t.title, t.artist, bm25(tracks_fts, 10.0, 5.0, 1.0) AS score
+  FROM tracks_fts
+  JOIN tracks t ON t.id = tracks_fts.rowid
+ WHERE tracks_fts MATCH ?
+   AND ({_AUDIO_ONLY})
+ ORDER BY score
+ LIMIT ?
+"""
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchHit(NamedTuple):
+    path: Path
+    title: Optional[str]
+    artist: Optional[str]
+    score: float  # bm25, lower is better
+
+
+class CachedResolution(NamedTuple):
+    video_id: str
+    path: Optional[Path]  # None if that video was never downloaded
+
+
+class CatalogChange(NamedTuple):
+    playlists: bool              # playlists were added, removed or renamed
+    tracks: tuple[str, ...] = ()  # playlists whose tracks changed
+    library: bool = False        # music/ tracks changed
+
+    def __bool__(self) -> bool:
+        return bool(self.playlists or self.tracks or self.library)
+
+
+Listener = Callable[[CatalogChange], None]
+
+
+def _title_artist(stem: str) -> tuple[str, Optional[str]]:
+    """'Artist - Title' (or yt-dlp's 'Artist_-_Title') -> (title, artist)."""
+    text = stem.replace("_", " ").strip()
+    if " - " in text:
+        artist, title = text.split(" - ", 1)
+        if artist.strip() and title.strip():
+            return title.strip(), artist.strip()
+    return text, None
+
+
+def _match_expr(query: str) -> Optional[str]:
+    """Every query token must match; the last one may be a prefix (still typing)."""
+    tokens = _TOKEN.findall(query.lower())
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens]
+    terms[-1] += "*"
+    return " AND ".join(terms)
+
+
+def _range(folder: Path) -> tuple[str, str]:
+    """(lo, hi) bounds selecting every path directly under `folder` via the path index."""
+    prefix = str(folder) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+def _mtime_ns(folder: Path) -> Optional[int]:
+    try:
+        return os.stat(folder).st_mtime_ns
+    except OSError:
+        return None
+
+
+class Catalog:
+    def __init__(self, db_path: str | Path = DB_PATH,
+                 music_dir: str | Path = MUSIC_DIR,
+                 playlists_dir: str | Path = PLAYLISTS_DIR) -> None:
+        self.music_dir = Path(music_dir).resolve()
+        self.playlists_dir = Path(playlists_dir).resolve()
+        self._lock = threading.RLock()
+        self._listeners: list[Listener] = []
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, cached_statements=128)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        has_fts = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'tracks_fts'"
+        ).fetchone()
+        if not has_fts:
+            # first run: create the index + triggers and backfill existing rows
+            self._conn.executescript("BEGIN;" + _FTS_SCHEMA + "COMMIT;")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- Change notifications ----------
+
+    def subscribe(self, listener: Listener) -> None:
+        """listener(CatalogChange) runs on the writing thread, after the commit."""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, change: CatalogChange) -> None:
+        if not change:
+            return
+        with self._lock:
+            listeners = list(self._listeners)
+        notify.notify_all(listeners, change)
+
+    # ---------- Reads ----------
+
+    def list_playlists(self) -> list[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute(_SQL_LIST_PLAYLISTS)]
+
+    def playlist_tracks(self, name: str) -> list[Path]:
+        """Files of playlist `name`, in playlist order."""
+        with self._lock:
+            return [Path(r[0]) for r in self._conn.execute(_SQL_PLAYLIST_TRACKS, (name,))]
+
+    def playlist_size(self, name: str) -> int:
+        with self._lock:
+            return self._conn.execute(_SQL_PLAYLIST_SIZE, (name,)).fetchone()[0]
+
+    def playlist_page(self, name: str, offset: int, limit: int) -> list[Path]:
+        """Rows offset .. offset+limit-1 of playlist_tracks(name), for paged views."""
+        with self._lock:
+            return [Path(r[0]) for r in self._conn.execute(_SQL_PLAYLIST_PAGE, (name, limit, offset))]
+
+    def search(self, query: str, limit: int = 10) -> list[SearchHit]:
+        """Ranked (bm25) full-text search over title, artist and file name of audio tracks."""
+        expr = _match_expr(query)
+        if expr is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(_SQL_SEARCH, (expr, limit)).fetchall()
+        return [SearchHit(Path(p), t, a, s) for p, t, a, s in rows]
+
+    # ---------- Query -> video id -> file cache ----------
+
+    def lookup_resolution(self, query: str, ttl: float = RESOLVE_TTL) -> Optional[CachedResolution]:
+        """Cached resolution of a normalized query, or None if unknown / expired."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(_SQL_CACHE_GET, (query,)).fetchone()
+            if row is None:
+                return None
+            video_id, resolved_at, path = row
+            if now - resolved_at > ttl:
+                self._conn.execute(_SQL_CACHE_DEL, (query,))
+                return None
+            self._conn.execute(_SQL_CACHE_TOUCH, (now, query))
+        return CachedResolution(video_id, Path(path) if path else None)
+
+    def store_resolution(self, query: str, video_id: str,
+                         max_entries: int = RESOLVE_MAX_ENTRIES) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(_SQL_CACHE_PUT, (query, video_id, now, now))
+            self._conn.execute(_SQL_CACHE_EVICT, (max_entries,))
+
+    def video_path(self, video_id: str) -> Optional[Path]:
+        with self._lock:
+            row = self._conn.execute(_SQL_VIDEO_GET, (video_id,)).fetchone()
+        return Path(row[0]) if row else None
+
+    def store_video_path(self, video_id: str, path: str | Path) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(_SQL_VIDEO_PUT, (video_id, str(Path(path).resolve())))
+
+    # ---------- Reconciling with the filesystem ----------
+
+    def sync(self) -> None:
+        """Bring the catalog up to date with music/ and playlists/ (cheap if nothing changed)."""
+        self.sync_folder(self.music_dir)
+        self.sync_playlists()
+        with self._lock, self._conn:
+            self._conn.execute(_SQL_PRUNE_ORPHANS, _range(self.music_dir))
+
+    def sync_playlists(self) -> None:
+        root = change_tracker.tracker_for(self.playlists_dir, kind="dirs")
+        root.poll()
+        on_disk = {p.name for p in root.entries()}
+        with self._lock, self._conn:
+            known = set(self.list_playlists())
+            for name in known - on_disk:
+                self._drop_playlist(name)
+            self._conn.executemany(_SQL_ADD_PLAYLIST, [(n,) for n in sorted(on_disk - known, key=str.casefold)])
+        self._notify(CatalogChange(playlists=known != on_disk))
+        for name in on_disk:
+            self.sync_folder(self.playlists_dir / name, playlist=name)
+
+    def sync_folder(self, folder: Path, playlist: Optional[str] = None, force: bool = False) -> bool:
+        """
+        Reconcile the tracks of one folder. Only re-lists it when its mtime
+        differs from the one stored at the last reconcile. Returns True if it did.
+        """
+        folder = Path(folder)
+        mtime = _mtime_ns(folder)
+        with self._lock:
+            row = self._conn.execute(_SQL_FOLDER_MTIME, (str(folder),)).fetchone()
+            if not force and row is not None and row[0] == mtime:
+                return False
+            on_disk = []
+            try:
+                with os.scandir(folder) as it:
+                    for e in it:
+                        if e.is_file() and self._wants(folder, e.name):
+                            on_disk.append(str(folder / e.name))
+            except OSError:
+                pass
+            lo, hi = _range(folder)
+            with self._conn:
+                known = dict(self._conn.execute(_SQL_FOLDER_TRACKS, (lo, hi)).fetchall())
+                disk = set(on_disk)
+                self._conn.executemany(_SQL_DEL_TRACK, [(p,) for p in known if p not in disk])
+                fresh = sorted((p for p in on_disk if p not in known), key=lambda p: Path(p).name.casefold())
+                self._insert_tracks(fresh, playlist)
+                self._set_mtime(folder, mtime)
+        self._notify(CatalogChange(playlists=False, tracks=(playlist,) if playlist else (),
+                                   library=folder == self.music_dir))
+        return True
+
+    def apply_changes(self, changes: change_tracker.Changes) -> None:
+        """change_tracker listener: apply a folder's deltas to the tables."""
+        d = Path(changes.directory)
+        if d == self.playlists_dir:
+            with self._lock, self._conn:
+                for p in changes.removed:
+                    self._drop_playlist(p.name)
+                for old, new in changes.renamed:
+                    self._rename_playlist(old, new)
+                self._conn.executemany(_SQL_ADD_PLAYLIST, [(p.name,) for p in changes.added])
+            self._notify(CatalogChange(playlists=True))
+            return
+        if d == self.music_dir:
+            playlist = None
+        elif d.parent == self.playlists_dir:
+            playlist = d.name
+        else:
+            return
+        created = False
+        with self._lock, self._conn:
+            self._conn.executemany(_SQL_DEL_TRACK, [(str(p),) for p in changes.removed])
+            if playlist is not None:
+                created = self._ensure_playlist(playlist)
+            # None: the folder itself is gone (the root tracker may already have
+            # dropped the playlist), so only its removals apply
+            if created is not None:
+                self._conn.executemany(
+                    _SQL_MOVE_TRACK,
+                    [(str(new), *_title_artist(new.stem), str(old)) for old, new in changes.renamed],
+                )
+                self._insert_tracks([str(p) for p in changes.added if self._wants(d, p.name)], playlist)
+                self._set_mtime(d, _mtime_ns(d))
+        self._notify(CatalogChange(playlists=bool(created), tracks=(playlist,) if playlist else (),
+                                   library=playlist is None))
+
+    # ---------- Internals (call with the lock held, inside a transaction) ----------
+
+    def _wants(self, folder: Path, name: str) -> bool:
+        # a download still writing under its final name is not a track yet
+        if change_tracker.being_written(folder / name):
+            return False
+        # playlists show every file they contain; the library only audio
+        if folder == self.music_dir:
+            return os.path.splitext(name)[1].lower() in AUDIO_EXTS
+        return True
+
+    def _set_mtime(self, folder: Path, mtime: Optional[int]) -> None:
+        if mtime is None:
+            self._conn.execute(_SQL_DEL_FOLDER_MTIME, (str(folder),))
+        else:
+            self._conn.execute(_SQL_SET_FOLDER_MTIME, (str(folder), mtime))
+
+    def _insert_tracks(self, paths: list[str], playlist: Optional[str]) -> None:
+        if not paths:
+            return
+        self._conn.executemany(_SQL_ADD_TRACK, [(p, *_title_artist(Path(p).stem)) for p in paths])
+        if playlist is None:
+            return
+        row = self._conn.execute(_SQL_PLAYLIST_ID, (playlist,)).fetchone()
+        if row is None:
+            # callers create the row (_ensure_playlist / sync_playlists); a
+            # missing one means the folder was deleted meanwhile
+            return
+        pid = row[0]
+        pos = self._conn.execute(_SQL_NEXT_POSITION, (pid,)).fetchone()[0]
+        links = []
+        for p in paths:
+            tid = self._conn.execute(_SQL_TRACK_ID, (p,)).fetchone()[0]
+            links.append((pid, tid, pos))
+            pos += 1
+        self._conn.executemany(_SQL_LINK_TRACK, links)
+
+    def _ensure_playlist(self, name: str) -> Optional[bool]:
+        """
+        Row for playlist folder `name`: True if it had to be created, False if
+        it was there, None if the folder no longer exists (nothing created).
+        """
+        if not (self.playlists_dir / name).is_dir():
+            return None
+        if self._conn.execute(_SQL_PLAYLIST_ID, (name,)).fetchone() is not None:
+            return False
+        self._conn.execute(_SQL_ADD_PLAYLIST, (name,))
+        return True
+
+    def _drop_playlist(self, name: str) -> None:
+        folder = self.playlists_dir / name
+        self._conn.execute(_SQL_DEL_FOLDER_TRACKS, _range(folder))
+        self._conn.execute(_SQL_DEL_PLAYLIST, (name,))
+        self._conn.execute(_SQL_DEL_FOLDER_MTIME, (str(folder),))
+
+    def _rename_playlist(self, old: Path, new: Path) -> None:
+        lo, hi = _range(old)
+        new_prefix = str(new) + os.sep
+        self._conn.execute(_SQL_RENAME_PLAYLIST, (new.name, old.name))
+        self._conn.execute(_SQL_MOVE_FOLDER_TRACKS, (new_prefix, len(lo) + 1, lo, hi))
+        self._conn.execute(_SQL_DEL_FOLDER_MTIME, (str(old),))
+
+
+_catalog: Optional[Catalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """Process-wide catalog: opened, synced and hooked to change_tracker on first use."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            MUSIC_DIR.mkdir(parents=True, exist_ok=True)
+            PLAYLISTS_DIR.mkdir(parents=True, exist_ok=True)
+            cat = Catalog()
+            change_tracker.subscribe_all(cat.apply_changes)
+            cat.sync()
+            _catalog = cat
+        return _catalog
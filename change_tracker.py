@@ -0,0 +1,347 @@
+# change_tracker.py
+"""
+Incremental change tracking for the music/ and playlists/ folders.
+
+Each tracked directory keeps its last seen mtime and a snapshot of its entries
+(name -> inode). poll() costs a single stat() while nothing changed; when the
+directory mtime moves, the entries are re-listed once and only the deltas
+(added / removed / renamed) are handed to the subscribers.
+
+A background watcher (start_watching) polls every tracked directory, and on
+Linux sleeps on inotify instead so changes are picked up immediately.
+
+Files still being written under their final name (progressive downloads) are
+registered with begin_write(); trackers, the library index and the catalog
+leave them out until end_write(), and record_added() then reports them.
+"""
+
+from __future__ import annotations
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import notify
+
+# A change landing in the same mtime tick as our scan would not move the mtime
+# again, so directories modified this recently are re-listed on the next poll.
+_RACY_NS = 2_000_000_000
+
+
+class Changes(NamedTuple):
+    directory: Path
+    added: list[Path]
+    removed: list[Path]
+    renamed: list[tuple[Path, Path]]  # (old, new)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.renamed)
+
+
+Listener = Callable[[Changes], None]
+
+
+class DirectoryTracker:
+    def __init__(self, directory: str | Path, kind: str = "files") -> None:
+        """
+        kind: "files" tracks the files of the directory (music/, a playlist),
+              "dirs" tracks its subfolders (playlists/).
+        """
+        self.directory = Path(directory)
+        self.kind = kind
+        self._lock = threading.RLock()
+        self._listeners: list[Listener] = []
+        self._mtime_ns = self._stat_mtime()
+        started = time.time_ns()
+        self._entries = self._list()
+        self._dirty = self._is_racy(started)
+
+    # ---------- Public API ----------
+
+    def entries(self) -> list[Path]:
+        """Current snapshot, as full paths."""
+        with self._lock:
+            return [self.directory / name for name in self._entries]
+
+    def subscribe(self, listener: Listener) -> None:
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def poll(self) -> Optional[Changes]:
+        """
+        Check the directory for changes. One stat() if the mtime is unchanged;
+        otherwise re-list it, notify subscribers with the deltas and return them.
+        """
+        with self._lock:
+            mtime = self._stat_mtime()
+            if mtime == self._mtime_ns and not self._dirty:
+                return None
+            started = time.time_ns()
+            new = self._list()
+            self._mtime_ns = mtime
+            self._dirty = self._is_racy(started)
+            changes = self._diff(self._entries, new)
+            self._entries = new
+        self._notify(changes)
+        return changes
+
+    def record(self, added=(), removed=()) -> Changes:
+        """
+        Apply changes we made ourselves (e.g. a finished download) without
+        re-listing the directory. Subscribers are notified as for poll().
+        """
+        with self._lock:
+            added_paths, removed_paths = [], []
+            for p in added:
+                p = Path(p)
+                if p.name in self._entries:
+                    continue
+                try:
+                    self._entries[p.name] = os.stat(p).st_ino
+                except OSError:
+                    continue
+                added_paths.append(self.directory / p.name)
+            for p in removed:
+                p = Path(p)
+                if self._entries.pop(p.name, None) is not None:
+                    removed_paths.append(self.directory / p.name)
+            changes = Changes(self.directory, added_paths, removed_paths, [])
+        self._notify(changes)
+        return changes
+
+    # ---------- Internals ----------
+
+    def _stat_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def _is_racy(self, scan_started_ns: int) -> bool:
+        return self._mtime_ns is not None and scan_started_ns - self._mtime_ns < _RACY_NS
+
+    def _list(self) -> dict[str, int]:
+        want_dirs = self.kind == "dirs"
+        out: dict[str, int] = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for e in it:
+                    try:
+                        ok = e.is_dir() if want_dirs else e.is_file()
+                        if ok and not being_written(e.path):
+                            out[e.name] = e.inode()
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return out
+
+    def _diff(self, old: dict[str, int], new: dict[str, int]) -> Changes:
+        gone = [n for n in old if n not in new]
+        fresh = [n for n in new if n not in old]
+        # A removed and an added name sharing an inode is a rename
+        by_inode = {old[n]: n for n in gone if old[n]}
+        renamed, added = [], []
+        for n in fresh:
+            src = by_inode.pop(new[n], None) if new[n] else None
+            if src is not None:
+                renamed.append((self.directory / src, self.directory / n))
+            else:
+                added.append(self.directory / n)
+        renamed_src = {old_p.name for old_p, _ in renamed}
+        removed = [self.directory / n for n in gone if n not in renamed_src]
+        return Changes(self.directory, added, removed, renamed)
+
+    def _notify(self, changes: Changes) -> None:
+        if not changes:
+            return
+        with self._lock:
+            listeners = list(self._listeners)
+        # global listeners (the catalog) first, so per-folder subscribers that
+        # read back from them see the change already applied
+        with _trackers_lock:
+            listeners = list(_global_listeners) + listeners
+        notify.notify_all(listeners, changes)
+
+
+# ---------- Process-wide registry + watcher ----------
+
+_trackers: dict[Path, DirectoryTracker] = {}
+_trackers_lock = threading.Lock()
+_global_listeners: list[Listener] = []
+_watcher: Optional[threading.Thread] = None
+# real paths of files a download is still writing (own lock: trackers list
+# their folder while _trackers_lock is held)
+_writing: set[str] = set()
+_writing_lock = threading.Lock()
+
+
+def subscribe_all(listener: Listener) -> None:
+    """Receive the deltas of every tracked folder, including ones tracked later."""
+    with _trackers_lock:
+        if listener not in _global_listeners:
+            _global_listeners.append(listener)
+
+
+def tracker_for(directory: str | Path, kind: str = "files") -> DirectoryTracker:
+    """Shared tracker for `directory`, created on first use."""
+    key = Path(directory).resolve()
+    with _trackers_lock:
+        t = _trackers.get(key)
+        if t is None:
+            t = _trackers[key] = DirectoryTracker(key, kind)
+        return t
+
+
+def poll_all() -> None:
+    with _trackers_lock:
+        trackers = list(_trackers.values())
+    for t in trackers:
+        t.poll()
+
+
+def begin_write(path: str | Path) -> None:
+    """path is being written in place: keep it out of every listing until end_write()."""
+    with _writing_lock:
+        _writing.add(os.path.realpath(path))
+
+
+def end_write(path: str | Path) -> None:
+    """path is complete (or gone); call record_added() next if it should show up."""
+    with _writing_lock:
+        _writing.discard(os.path.realpath(path))
+
+
+def being_written(path: str | Path) -> bool:
+    if not _writing:
+        return False
+    with _writing_lock:
+        return os.path.realpath(path) in _writing
+
+
+def record_added(path: str | Path) -> None:
+    """Tell the tracker of path's folder (if any) that we just created it."""
+    path = Path(path).resolve()
+    with _trackers_lock:
+        t = _trackers.get(path.parent)
+    if t is not None:
+        t.record(added=[path])
+
+
+def record_removed(path: str | Path) -> None:
+    """Tell the tracker of path's folder (if any) that we just deleted it."""
+    path = Path(path)
+    with _trackers_lock:
+        t = _trackers.get(path.parent.resolve())
+    if t is not None:
+        t.record(removed=[path])
+
+
+# inotify constants (linux/inotify.h)
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_MASK = _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF
+_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Tiny ctypes wrapper; only used to wake the watcher up early."""
+
+    def __init__(self) -> None:
+        import ctypes, ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wds: dict[int, DirectoryTracker] = {}
+        self._watched: set[Path] = set()
+
+    def watch(self, trackers: list[DirectoryTracker]) -> None:
+        for t in trackers:
+            if t.directory in self._watched:
+                continue
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(t.directory), _IN_MASK)
+            if wd >= 0:
+                self._wds[wd] = t
+                self._watched.add(t.directory)
+
+    def read(self) -> set[DirectoryTracker]:
+        hit: set[DirectoryTracker] = set()
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return hit
+        i = 0
+        while i + _EVENT.size <= len(buf):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buf, i)
+            i += _EVENT.size + length
+            t = self._wds.get(wd)
+            if t is None:
+                continue
+            hit.add(t)
+            if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                # watch is gone; re-add it if the folder comes back
+                self._wds.pop(wd, None)
+                self._watched.discard(t.directory)
+        return hit
+
+
+def start_watching(interval: float = 1.0, use_inotify: bool = True) -> None:
+    """
+    Start the background watcher (idempotent). Subscribers are called from
+    the watcher thread; GUI code must marshal onto the Tk thread itself.
+    """
+    global _watcher
+    if _watcher is not None:
+        return
+
+    ino = None
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            ino = _Inotify()
+        except Exception:
+            # no inotify (limits, seccomp...): fall back to polling, but say why
+            traceback.print_exc()
+            ino = None
+
+    def loop():
+        while True:
+            try:
+                if ino is None:
+                    time.sleep(interval)
+                    poll_all()
+                    continue
+                with _trackers_lock:
+                    trackers = list(_trackers.values())
+                ino.watch(trackers)
+                # long timeout: inotify wakes us; the periodic sweep catches
+                # folders that did not exist yet when we tried to watch them
+                ready, _, _ = select.select([ino.fd], [], [], interval * 10)
+                if ready:
+                    for t in ino.read():
+                        t.poll()
+                else:
+                    poll_all()
+            except Exception:
+                # keep watching, but don't hide what went wrong
+                traceback.print_exc()
+                time.sleep(interval)
+
+    _watcher = threading.Thread(target=loop, name="change-tracker", daemon=True)
+    _watcher.start()
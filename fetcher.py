@@ -1,14 +1,247 @@
 # fetcher.py
 import yt_dlp
+import atexit
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
+
+import catalog
+import change_tracker
+import library_index
+import progressive
+import scheduler
+
+#Single-flight registry: one download per normalized query / video id at a time.
+#A second caller asking for the same thing joins the running download's future
+#instead of starting its own yt-dlp session writing the same file. A joiner with a
+#progressive stream follows the owner's stream (see GrowingFile.follow).
+_inflight: dict[str, Future] = {}
+_inflight_streams: dict[str, Optional[progressive.GrowingFile]] = {}
+_inflight_lock = threading.Lock()
+
+
+def _single_flight(key, fn, stream=None):
+    while True:
+        with _inflight_lock:
+            fut = _inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = _inflight[key] = Future()
+                _inflight_streams[key] = stream
+            else:
+                owner_stream = _inflight_streams.get(key)
+        if owner:
+            break
+        if stream is not None:
+            stream.follow(owner_stream)
+        try:
+            return _wait_joined(fut)
+        except scheduler.Cancelled:
+            # the job we joined was cancelled, not ours: run the download ourselves
+            scheduler.check_cancelled()
+    try:
+        result = fn()
+    except BaseException as e:
+        # unregister before waking joiners, so a retrying joiner starts afresh
+        _release(key)
+        fut.set_exception(e)
+        raise
+    _release(key)
+    fut.set_result(result)
+    return result
+
+
+def _release(key):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+        _inflight_streams.pop(key, None)
+
+
+#Waits on another caller's download while still honouring our own cancel token
+def _wait_joined(fut):
+    while True:
+        try:
+            return fut.result(timeout=0.25)
+        except FutureTimeout:
+            scheduler.check_cancelled()
+
+
+#Pool of long-lived YoutubeDL sessions, keyed by option set (audio / m4a preference /
+#video). Building a YoutubeDL loads every extractor and throws away its HTTP
+#connections, so downloads borrow an idle session instead of making one.
+#The output template differs per call (folder, filename), so it is not part of the
+#key: it is set on the session at each borrow. A session is only ever used by one
+#thread at a time.
+class _SessionPool:
+    # options set on every borrow instead of keying the pool
+    PER_BORROW = ("outtmpl",)
+
+    def __init__(self, max_idle_per_key: int = 4) -> None:
+        self.max_idle_per_key = max_idle_per_key
+        self._idle: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _key(cls, opts: dict) -> tuple:
+        return tuple(sorted((k, repr(v)) for k, v in opts.items() if k not in cls.PER_BORROW))
+
+    @staticmethod
+    def _set_outtmpl(ydl, outtmpl) -> None:
+        # YoutubeDL keeps its templates as {"default": ..., <type>: ...}
+        current = ydl.params.get("outtmpl")
+        if isinstance(current, dict) and not isinstance(outtmpl, dict):
+            current["default"] = outtmpl
+        else:
+            ydl.params["outtmpl"] = outtmpl
+
+    @contextmanager
+    def borrow(self, opts: dict):
+        """Yield (session, reused) for exclusive use; it goes back to the pool afterwards."""
+        key = self._key(opts)
+        with self._lock:
+            idle = self._idle.get(key)
+            ydl = idle.pop() if idle else None
+        reused = ydl is not None
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(dict(opts))
+        elif "outtmpl" in opts:
+            self._set_outtmpl(ydl, opts["outtmpl"])
+        try:
+            yield ydl, reused
+        finally:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_key:
+                    idle.append(ydl)
+                    ydl = None
+            if ydl is not None:
+                ydl.close()
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = [y for idle in self._idle.values() for y in idle]
+            self._idle.clear()
+        for ydl in sessions:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+
+
+_sessions = _SessionPool()
+atexit.register(_sessions.close)
+
+
+def borrow_session(opts: dict):
+    """Context manager yielding (YoutubeDL, reused) from the shared session pool."""
+    return _sessions.borrow(opts)
+
+
+#Per-download timings (seconds), to see what session reuse saves
+class DownloadTiming(NamedTuple):
+    session: float    # getting a session (building one if none was idle)
+    resolve: float    # extract_info without download
+    download: float   # fetching the file (0 if it was already on disk)
+    reused: bool      # session came from the pool
+
+
+_timings: deque = deque(maxlen=200)
+_timings_lock = threading.Lock()
+
+
+def _record_timing(t: DownloadTiming) -> None:
+    with _timings_lock:
+        _timings.append(t)
+    print(f"[fetcher] session {t.session*1000:.0f} ms ({'reused' if t.reused else 'new'}), "
+          f"resolve {t.resolve:.2f} s, download {t.download:.2f} s")
+
+
+def download_stats() -> dict:
+    """Average timings over the recent downloads, split by new vs reused session."""
+    with _timings_lock:
+        recent = list(_timings)
+    out = {"count": len(recent)}
+    for label, group in (("new", [t for t in recent if not t.reused]),
+                         ("reused", [t for t in recent if t.reused])):
+        if group:
+            out[label] = {
+                "count": len(group),
+                "avg_session": sum(t.session for t in group) / len(group),
+                "avg_resolve": sum(t.resolve for t in group) / len(group),
+                "avg_download": sum(t.download for t in group) / len(group),
+            }
+    return out
+
+
+#What a download produced. Path-like, so Path(result) / open(result) keep working
+#for callers that only want the file.
+@dataclass(frozen=True)
+class DownloadResult:
+    path: str
+    video_id: Optional[str] = None
+    duration: Optional[float] = None  # seconds, as reported by the extractor
+    size: Optional[int] = None        # bytes on disk
+    format: Optional[str] = None      # yt-dlp format id, e.g. "140"
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __str__(self) -> str:
+        return self.path
+
+
+#yt-dlp reports where files land through its hooks; the hooks are shared by every
+#pooled session, so they write into the calling thread's capture (a session only
+#ever runs on the thread that borrowed it).
+_capture = threading.local()
+
+
+def _on_progress(d):
+    # yt-dlp calls this for every chunk: the place to stop a cancelled scheduler job
+    scheduler.check_cancelled()
+    cap = getattr(_capture, "current", None)
+    if cap is None:
+        return
+    stream = cap.get("stream")
+    if stream is not None and d.get("status") in ("downloading", "finished"):
+        # with nopart the bytes are already under the final name: let readers
+        # in (_download_resolved keeps the file out of the library meanwhile)
+        if d.get("filename") and not change_tracker.being_written(d["filename"]):
+            # yt-dlp picked another name than prepare_filename() predicted
+            if cap.get("writing"):
+                change_tracker.end_write(cap["writing"])
+            cap["writing"] = d["filename"]
+            change_tracker.begin_write(cap["writing"])
+        stream.update(d.get("filename"), d.get("downloaded_bytes"), d.get("total_bytes"))
+    if d.get("status") == "finished":
+        cap["downloaded"] = d.get("filename")
+        cap["bytes"] = d.get("total_bytes") or d.get("downloaded_bytes")
+
+
+def _on_postprocessed(d):
+    cap = getattr(_capture, "current", None)
+    if cap is not None and d.get("status") == "finished":
+        # postprocessors run in order and the last one (MoveFiles) reports the final path
+        path = (d.get("info_dict") or {}).get("filepath")
+        if path:
+            cap["final"] = path
+
 
 #Downloads audio only, as .m4a or webm using youtube-dl
-#Returns full path as a string to the saved auido file
+#Returns a DownloadResult for the saved audio file (None if yt-dlp reported no file)
 #takes the url or query (as per youtube-dl peramaters) as  string, the output folder name as a string,
 #prefernce for the m4a filetype (bool), and a the option for a custom filename
 #If no output directroy is specified it will be saved to the music folder, if non exists it will create one
 #If no filename is specified, it will use youtube-dl's given name (usually just the youtube video name)
-def download_youtube_audio(url_or_query, output_dir="music", prefer_m4a=True, filename=None):
+#cache_key: normalized query to remember the resolved video id under (see make_yt_search)
+#stream: optional progressive.GrowingFile, fed while downloading so playback can start early
+def download_youtube_audio(url_or_query, output_dir="music", prefer_m4a=True, filename=None, cache_key=None,
+                           stream=None):
 
     os.makedirs(output_dir, exist_ok=True)
 
@@ -26,61 +259,145 @@ def download_youtube_audio(url_or_query, output_dir="music", prefer_m4a=True, fi
         "noplaylist": True,
         "quiet": False,
         "restrictfilenames": True,
+        "progress_hooks": [_on_progress],
+        "postprocessor_hooks": [_on_postprocessed],
     }
+    if stream is not None:
+        # write straight to the final name so a player can read the file as it grows
+        ydl_opts["nopart"] = True
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url_or_query, download=True)
+    t0 = time.perf_counter()
+    with borrow_session(ydl_opts) as (ydl, reused):
+        t1 = time.perf_counter()
+        # Resolve first (no download) so concurrent requests for the same
+        # video can be joined by id, even when the queries differ
+        info = ydl.extract_info(url_or_query, download=False)
+        t2 = time.perf_counter()
 
         # If a search/playlist was used, pick the first entry
         if isinstance(info, dict) and "entries" in info and info["entries"]:
             info = info["entries"][0]
 
-        # Best source of truth for the final file path:
-        final_path = None
+        video_id = info.get("id") if isinstance(info, dict) else None
+        if not video_id:
+            result = _download_resolved(ydl, info, stream)
+            _record_timing(DownloadTiming(t1 - t0, t2 - t1, time.perf_counter() - t2, reused))
+            return result
+
+        cat = catalog.get_catalog()
+        if cache_key:
+            cat.store_resolution(cache_key, video_id)
+        # Already have this exact upload (downloaded under another query)
+        have = cat.video_path(video_id)
+        if have and have.exists():
+            print(f"Already downloaded: {have}")
+            _record_timing(DownloadTiming(t1 - t0, t2 - t1, 0.0, reused))
+            return _existing_result(have, video_id, info.get("duration"))
+
+        def download():
+            result = _download_resolved(ydl, info, stream)
+            if result is not None:
+                cat.store_video_path(video_id, result.path)
+            return result
+
+        result = _single_flight(f"id:{video_id}", download, stream)
+        _record_timing(DownloadTiming(t1 - t0, t2 - t1, time.perf_counter() - t2, reused))
+        return result
+
+
+#Downloads an already resolved entry; the final path comes from the hooks above
+def _download_resolved(ydl, info, stream=None):
+    cap = _capture.current = {"stream": stream}
+    if stream is not None:
+        # nopart creates the output file under its final name before the first
+        # progress report: keep it out of the library from the start
         try:
-            # Newer yt-dlp returns requested_downloads with finalized filepaths
-            final_path = info["requested_downloads"][0]["filepath"]
+            cap["writing"] = ydl.prepare_filename(info)
         except Exception:
-            # Fallback 1: prepare_filename (may show .NA sometimes)
-            try:
-                final_path = ydl.prepare_filename(info)
-            except Exception:
-                final_path = None
-
-        # Fallback 2: try to locate by our chosen base name (if provided)
-        if (not final_path or final_path.endswith(".NA")) and filename:
-            base = os.path.join(output_dir, filename)
-            for ext in ("m4a", "webm", "mp3", "mp4", "opus"):
-                cand = f"{base}.{ext}"
-                if os.path.exists(cand):
-                    final_path = cand
-                    break
-
-        # Last resort: newest audio-ish file in output_dir
-        if not final_path or not os.path.exists(final_path):
-            candidates = [
-                os.path.join(output_dir, f)
-                for f in os.listdir(output_dir)
-                if f.lower().endswith((".m4a", ".webm", ".mp3", ".mp4", ".opus"))
-            ]
-            if candidates:
-                candidates.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-                final_path = candidates[0]        
-
-        print(f"Downloaded audio: {final_path}")
-        #Returns path as a string
-        return final_path  
+            cap["writing"] = None
+        if cap["writing"]:
+            change_tracker.begin_write(cap["writing"])
+    try:
+        info = ydl.process_ie_result(info, download=True)
+    except BaseException:
+        if stream is not None:
+            # nopart leaves a truncated file under the real name; don't let it
+            # pass for a library track
+            progressive.discard_partial(stream.path)
+            if stream.path:
+                library_index.file_removed(stream.path)
+        raise
+    finally:
+        _capture.current = None
+        if cap.get("writing"):
+            change_tracker.end_write(cap["writing"])
+
+    # Postprocessor hook (final, after any moves) > progress hook (the file as
+    # downloaded) > requested_downloads (also set when the file already existed)
+    final_path = cap.get("final") or cap.get("downloaded")
+    if not final_path:
+        try:
+            final_path = info["requested_downloads"][0]["filepath"]
+        except (KeyError, IndexError, TypeError):
+            final_path = None
+    if not final_path or not os.path.exists(final_path):
+        print(f"Download finished but no file was reported for {info.get('id')}")
+        return None
+
+    try:
+        size = os.path.getsize(final_path)
+    except OSError:
+        size = cap.get("bytes")
+    result = DownloadResult(
+        path=os.path.abspath(final_path),
+        video_id=info.get("id"),
+        duration=info.get("duration"),
+        size=size,
+        format=info.get("format_id"),
+    )
+    print(f"Downloaded audio: {result.path}")
+    # Push the new file straight into the library index (no rescan)
+    library_index.file_added(result.path)
+    return result
+
+
+def _existing_result(path, video_id=None, duration=None):
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = None
+    return DownloadResult(str(path), video_id, duration, size)
 
 #Cleans up the song name so it diaplys more nicely in the GUI
 #Replaces spaces with underscores, removes leading and trailing spaces
 def clean_song_name(song_name: str) -> str:
     return song_name.strip().replace(" ", "_")
 
-def make_yt_search(song_name):
-    # Return the path so player.py can use it
+def make_yt_search(song_name, stream=None):
+    # Return a DownloadResult (path-like) so player.py can use it
+    #stream: optional progressive.GrowingFile to follow the download as it happens
     #Crurrently accepts only name search, should modify to take link and name
+    #Concurrent calls with the same (normalized) query share one download
+    #Queries resolved before (see catalog.resolve_cache) skip the remote search,
+    #and if that video is already on disk, skip the network entirely
 
     if "http" in song_name:
-        return download_youtube_audio(song_name, output_dir="music", prefer_m4a=True)
+        key = song_name.strip()
+        target = key
+    else:
+        key = library_index.normalize(song_name)
+        target = 'ytsearch1:' + song_name.strip()# filename=song_name) <--- removed this, older version had filename as search query, not its the video name
+
+    cached = catalog.get_catalog().lookup_resolution(key)
+    if cached is not None:
+        if cached.path is not None and cached.path.exists():
+            print(f"Cached: {cached.path}")
+            return _existing_result(cached.path, cached.video_id)
+        if target.startswith("ytsearch1:"):
+            # known video, file gone: fetch it directly instead of searching again
+            target = f"https://www.youtube.com/watch?v={cached.video_id}"
 
-    return download_youtube_audio('ytsearch1:' + song_name.strip(), output_dir="music", prefer_m4a=True)# filename=song_name) <--- removed this, older version had filename as search query, not its the video name
+    # Always download into the library folder: it is the store every playlist
+    # links to, regardless of the current working directory
+    return _single_flight(f"q:{key}", lambda: download_youtube_audio(
+        target, output_dir=str(catalog.MUSIC_DIR), prefer_m4a=True, cache_key=key, stream=stream), stream)
@@ -0,0 +1,127 @@
+# gradient.py
+"""
+Vertical gradients for the page headers, drawn as one cached image.
+
+A gradient is rendered once per (colors, height) into a PhotoImage as wide
+as the screen; every canvas showing that gradient (the Search, Manage
+Playlists and Playlist pages all use ACCENT -> BG) shares the image and just
+shows it at its own width, so a resize costs one canvas item update instead
+of a create_line per pixel row. Resizes are debounced on top of that.
+
+The pixels are built with NumPy when it is installed, otherwise row by row
+in pure Python; both produce a binary PPM that Tk decodes in C.
+"""
+
+from __future__ import annotations
+import tkinter as tk
+from collections import OrderedDict
+from typing import Callable, Optional
+
+try:
+    import numpy as np
+except ImportError:  # optional: only makes building a new size faster
+    np = None
+
+# Wait this long after the last <Configure> before repainting
+RESIZE_DEBOUNCE_MS = 60
+# Distinct (colors, height) images kept
+CACHE_SIZE = 16
+
+_TAG = "grad"
+
+
+def _rgb8(widget: tk.Misc, color: str) -> tuple[int, int, int]:
+    r, g, b = widget.winfo_rgb(color)
+    return r // 256, g // 256, b // 256
+
+
+def gradient_ppm(top: tuple[int, int, int], bottom: tuple[int, int, int],
+                 width: int, height: int) -> bytes:
+    """Binary PPM (P6) of a top -> bottom gradient (8-bit RGB tuples)."""
+    header = b"P6 %d %d 255\n" % (width, height)
+    if np is not None:
+        t = np.arange(height, dtype=np.float64)[:, None] / max(1, height)
+        col = (np.array(top, dtype=np.float64) + t * (np.array(bottom) - np.array(top))).astype(np.uint8)
+        return header + np.ascontiguousarray(np.broadcast_to(col[:, None, :], (height, width, 3))).tobytes()
+    rows = []
+    for y in range(height):
+        px = bytes(int(a + (b - a) * y / max(1, height)) for a, b in zip(top, bottom))
+        rows.append(px * width)
+    return header + b"".join(rows)
+
+
+class GradientRenderer:
+    def __init__(self, cache_size: int = CACHE_SIZE) -> None:
+        self._cache: OrderedDict[tuple, tk.PhotoImage] = OrderedDict()
+        self._cache_size = cache_size
+        self.built = 0  # images rendered (cache misses)
+
+    def image(self, widget: tk.Misc, color1: str, color2: str, height: int,
+              min_width: int = 0) -> tk.PhotoImage:
+        """The gradient color1 -> color2 at `height` px, at least min_width wide."""
+        key = (color1, color2, height)
+        img = self._cache.get(key)
+        if img is None or img.width() < min_width:
+            width = max(min_width, widget.winfo_screenwidth())
+            data = gradient_ppm(_rgb8(widget, color1), _rgb8(widget, color2), width, height)
+            img = tk.PhotoImage(master=widget, data=data)
+            self._cache[key] = img
+            self.built += 1
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        self._cache.move_to_end(key)
+        return img
+
+    def paint(self, canvas: tk.Canvas, color1: str, color2: str) -> bool:
+        """Show the gradient on canvas now, under everything else. False if it has no size yet."""
+        w, h = int(canvas.winfo_width()), int(canvas.winfo_height())
+        if w <= 0 or h <= 0:
+            return False
+        img = self.image(canvas, color1, color2, h, min_width=w)
+        items = canvas.find_withtag(_TAG)
+        if items:
+            canvas.itemconfigure(items[0], image=img)
+        else:
+            canvas.create_image(0, 0, anchor="nw", image=img, tags=(_TAG,))
+        canvas.tag_lower(_TAG)
+        # Tk drops an image once Python does; keep it alive past cache eviction
+        canvas._gradient_image = img
+        return True
+
+    def attach(self, canvas: tk.Canvas, color1: str, color2: str,
+               on_paint: Optional[Callable[[int, int], None]] = None,
+               delay_ms: int = RESIZE_DEBOUNCE_MS) -> None:
+        """
+        Keep canvas painted across resizes. on_paint(w, h) runs after each
+        repaint, e.g. to re-place a title. The first paint is immediate,
+        later ones wait until resizing pauses for delay_ms.
+        """
+        pending = None
+
+        def repaint():
+            nonlocal pending
+            pending = None
+            if self.paint(canvas, color1, color2) and on_paint is not None:
+                on_paint(int(canvas.winfo_width()), int(canvas.winfo_height()))
+
+        def on_configure(_evt=None):
+            nonlocal pending
+            if not canvas.find_withtag(_TAG):
+                repaint()
+                return
+            if pending is not None:
+                canvas.after_cancel(pending)
+            pending = canvas.after(delay_ms, repaint)
+
+        canvas.bind("<Configure>", on_configure)
+
+
+_renderer: Optional[GradientRenderer] = None
+
+
+def get_renderer() -> GradientRenderer:
+    """Process-wide renderer, so all pages share one image cache."""
+    global _renderer
+    if _renderer is None:
+        _renderer = GradientRenderer()
+    return _renderer
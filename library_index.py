@@ -0,0 +1,303 @@
+# library_index.py
+"""
+In-memory index of the audio files in a folder (music/ or playlists/<name>/).
+
+Built once from the folder's change_tracker snapshot, then kept up to date by
+the tracker's deltas (and add()/remove() for files we create ourselves).
+Lookups cost one stat() of the folder plus whatever the lookup structures need.
+
+- exact hits: dict of normalized stem -> paths (O(1))
+- prefix hits: sorted list of normalized stems (bisect)
+- substring hits: trigram -> stems postings, so "query in stem" only verifies
+  the few stems sharing every trigram with the query
+- fuzzy hits: the same postings pick the stems sharing enough trigrams to be
+  within the edit budget (q-gram lemma); only those get a bounded edit distance
+"""
+
+from __future__ import annotations
+import bisect
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import NamedTuple
+
+import change_tracker
+
+AUDIO_EXTS = {".m4a", ".webm", ".mp4", ".mp3", ".opus"}
+
+_WS = re.compile(r"\s+")
+
+
+def normalize(s: str) -> str:
+    s = s.strip().lower()
+    s = _WS.sub(" ", s)
+    return s
+
+
+def _trigrams(s: str) -> set[str]:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _padded_trigrams(s: str) -> set[str]:
+    # word-boundary grams (" ab", "yz ") keep short words findable despite typos
+    return _trigrams(f" {s} ")
+
+
+def _substring_distance(pattern: str, text: str, max_dist: int) -> int:
+    """
+    Fewest edits (insert, delete, substitute, swap two neighbours) turning
+    `pattern` into some substring of `text`. Gives up early and returns
+    max_dist + 1 once that is exceeded.
+    """
+    prev2 = None
+    prev = [0] * (len(text) + 1)
+    for i, pc in enumerate(pattern, 1):
+        cur = [i] + [0] * len(text)
+        for j, tc in enumerate(text, 1):
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (pc != tc))
+            if prev2 is not None and j > 1 and pc == text[j - 2] and pattern[i - 2] == tc:
+                d = min(d, prev2[j - 2] + 1)
+            cur[j] = d
+        if min(cur) > max_dist:
+            return max_dist + 1
+        prev2, prev = prev, cur
+    return min(prev)
+
+
+class FuzzyHit(NamedTuple):
+    score: float  # 0..1, 1 = exact
+    path: Path
+
+
+class LibraryIndex:
+    def __init__(self, directory: str | Path, exts: set[str] = AUDIO_EXTS) -> None:
+        self.directory = Path(directory)
+        self.exts = {e.lower() for e in exts}
+        self._lock = threading.RLock()
+        # normalized stem -> paths with that stem (insertion ordered)
+        self._by_stem: dict[str, list[Path]] = {}
+        # every normalized stem, kept sorted for prefix lookups
+        self._sorted: list[str] = []
+        # trigram (of the space-padded stem) -> normalized stems containing it
+        self._grams: dict[str, set[str]] = {}
+        self._built = False
+        self._tracker = change_tracker.tracker_for(self.directory)
+        self._tracker.subscribe(self.apply_changes)
+
+    # ---------- Building / updating ----------
+
+    def build(self) -> None:
+        """(Re)build the index from the tracker's snapshot of the directory."""
+        with self._lock:
+            self._by_stem.clear()
+            self._sorted.clear()
+            self._grams.clear()
+            for path in self._tracker.entries():
+                self.add(path)
+            self._built = True
+
+    def ensure_built(self) -> None:
+        if not self._built:
+            self.build()
+
+    def accepts(self, path: str | Path) -> bool:
+        return Path(path).suffix.lower() in self.exts and not change_tracker.being_written(path)
+
+    def add(self, path: str | Path) -> None:
+        """Add a file to the index (no-op for non-audio files or duplicates)."""
+        path = Path(os.path.abspath(path))
+        if not self.accepts(path):
+            return
+        key = normalize(path.stem)
+        with self._lock:
+            paths = self._by_stem.get(key)
+            if paths is None:
+                self._by_stem[key] = [path]
+                bisect.insort(self._sorted, key)
+                for g in _padded_trigrams(key):
+                    self._grams.setdefault(g, set()).add(key)
+            elif path not in paths:
+                paths.append(path)
+
+    def remove(self, path: str | Path) -> None:
+        """Drop a file from the index (no-op if it isn't indexed)."""
+        path = Path(os.path.abspath(path))
+        key = normalize(path.stem)
+        with self._lock:
+            paths = self._by_stem.get(key)
+            if not paths or path not in paths:
+                return
+            paths.remove(path)
+            if paths:
+                return
+            del self._by_stem[key]
+            i = bisect.bisect_left(self._sorted, key)
+            if i < len(self._sorted) and self._sorted[i] == key:
+                del self._sorted[i]
+            for g in _padded_trigrams(key):
+                keys = self._grams.get(g)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._grams[g]
+
+    def apply_changes(self, changes: change_tracker.Changes) -> None:
+        """Tracker subscriber: apply only the added / removed / renamed files."""
+        with self._lock:
+            for path in changes.removed:
+                self.remove(path)
+            for old, new in changes.renamed:
+                self.remove(old)
+                self.add(new)
+            for path in changes.added:
+                self.add(path)
+
+    # ---------- Lookups ----------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(p) for p in self._by_stem.values())
+
+    def paths(self) -> list[Path]:
+        with self._lock:
+            return [p for paths in self._by_stem.values() for p in paths]
+
+    def _first_alive(self, key: str) -> Path | None:
+        # Files can be deleted behind our back; drop those entries lazily
+        for path in list(self._by_stem.get(key, ())):
+            if path.exists():
+                return path
+            self.remove(path)
+        return None
+
+    def _prefix_keys(self, q: str):
+        i = bisect.bisect_left(self._sorted, q)
+        while i < len(self._sorted) and self._sorted[i].startswith(q):
+            yield self._sorted[i]
+            i += 1
+
+    def _containing_keys(self, q: str):
+        if len(q) < 3:
+            # too short for trigrams; fall back to scanning the (in-memory) stems
+            yield from (k for k in self._sorted if q in k)
+            return
+        postings = sorted((self._grams.get(g, set()) for g in _trigrams(q)), key=len)
+        if not postings or not postings[0]:
+            return
+        cands = set(postings[0]).intersection(*postings[1:])
+        yield from sorted(k for k in cands if q in k)
+
+    def _contained_keys(self, q: str):
+        # stems that are a substring of the query: probe every substring of q
+        seen = set()
+        n = len(q)
+        for length in range(n, 0, -1):
+            for i in range(n - length + 1):
+                sub = q[i:i + length]
+                if sub not in seen and sub in self._by_stem:
+                    seen.add(sub)
+                    yield sub
+
+    def fuzzy(self, song_name: str, threshold: float = 0.75, limit: int = 5,
+              max_candidates: int = 50) -> list[FuzzyHit]:
+        """
+        Typo-tolerant lookup: scored hits (best first) with score >= threshold.
+
+        The shorter of query/stem is aligned anywhere inside the longer one;
+        score = (1 - edits / len(shorter)), scaled down a little when the
+        shorter string only covers part of the longer one.
+        """
+        q = normalize(song_name)
+        if len(q) < 3:
+            return []
+        grams = _padded_trigrams(q)
+        max_edits = int((1.0 - threshold) * len(q))
+        # each edit destroys at most 4 of the query's trigrams (3, or 4 for a swap)
+        min_shared = max(1, len(grams) - 4 * max_edits)
+        self._tracker.poll()
+        with self._lock:
+            self.ensure_built()
+            shared = Counter()
+            for g in grams:
+                shared.update(self._grams.get(g, ()))
+            cands = [k for k, n in shared.most_common(max_candidates) if n >= min_shared]
+            hits = []
+            for key in cands:
+                pattern, text = (q, key) if len(q) <= len(key) else (key, q)
+                budget = int((1.0 - threshold) * len(pattern))
+                d = _substring_distance(pattern, text, budget)
+                if d > budget:
+                    continue
+                score = (1.0 - d / len(pattern)) * (0.85 + 0.15 * len(pattern) / len(text))
+                if score < threshold:
+                    continue
+                hit = self._first_alive(key)
+                if hit:
+                    hits.append(FuzzyHit(score, hit))
+        hits.sort(key=lambda h: -h.score)
+        return hits[:limit]
+
+    def find_exact(self, song_name: str) -> Path | None:
+        """Only the O(1) exact normalized-stem hit, or None."""
+        q = normalize(song_name)
+        if not q:
+            return None
+        self._tracker.poll()
+        with self._lock:
+            self.ensure_built()
+            return self._first_alive(q)
+
+    def find(self, song_name: str) -> Path | None:
+        """
+        Return the indexed file best matching `song_name`: exact normalized
+        stem first, then stems starting with / containing the query, then
+        stems contained in the query. None if nothing matches.
+        """
+        q = normalize(song_name)
+        if not q:
+            return None
+        self._tracker.poll()
+        with self._lock:
+            self.ensure_built()
+            hit = self._first_alive(q)
+            if hit:
+                return hit
+            for keys in (self._prefix_keys(q), self._containing_keys(q), self._contained_keys(q)):
+                for key in list(keys):
+                    hit = self._first_alive(key)
+                    if hit:
+                        return hit
+        return None
+
+
+_indexes: dict[Path, LibraryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def index_for(directory: str | Path) -> LibraryIndex:
+    """Process-wide index for `directory`, created (and built) on first use."""
+    key = Path(directory).resolve()
+    key.mkdir(parents=True, exist_ok=True)
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            idx = _indexes[key] = LibraryIndex(key)
+    idx.ensure_built()
+    return idx
+
+
+def file_added(path: str | Path) -> None:
+    """
+    Push a file we just created (download, move) straight into its folder's
+    tracker and index, so nothing has to be re-listed to find it.
+    """
+    path = Path(path).resolve()
+    index_for(path.parent)
+    change_tracker.record_added(path)
+
+
+def file_removed(path: str | Path) -> None:
+    """Counterpart of file_added() for files we moved or deleted ourselves."""
+    change_tracker.record_removed(path)
@@ -0,0 +1,18 @@
+# notify.py
+"""
+Fan-out to subscriber callbacks, shared by the change trackers, the catalog
+and the playback service.
+"""
+
+from __future__ import annotations
+import traceback
+from typing import Callable, Iterable
+
+
+def notify_all(listeners: Iterable[Callable[..., object]], *args) -> None:
+    """Call every listener with args. One that raises is logged and the rest still run."""
+    for cb in listeners:
+        try:
+            cb(*args)
+        except Exception:
+            traceback.print_exc()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
-Lightweight playback wrapper around python-vlc (libVLC).
+Lightweight playback wrapper around python-vlc (libVLC), or any other
+PlaybackBackend (see sim_backend.SimulatedBackend for a headless one).
 
 Features:
 - play / pause / resume / stop
@@ -8,16 +9,44 @@ Features:
 - set/get volume (0.0..1.0)
 - get_position() -> (current_sec, total_sec)
 - is_playing()
+- snapshot() -> PlaybackSnapshot(time, length, state, volume), kept current by
+  player events; the getters above read it without locks or libVLC calls, and
+  subscribe() delivers every change instead of polling
 - end-of-track callback (on_finished)
+- play-while-downloading: play() accepts a progressive.GrowingFile and feeds
+  VLC from the growing file through libVLC's media callbacks
+- gapless queues: preload() parses the next track into a standby player that
+  a handoff thread starts the moment the current one ends (on_track_changed)
+- backends: PlaybackService drives two BackendPlayers; VlcBackend is the
+  default, tests and benchmarks can pass backend=SimulatedBackend()
 
 Portable VLC (Windows):
 - Pass vlc_dir=Path("tools/vlc") if you keep VLC next to your app.
+
+Every player in the process shares one libVLC instance (shared_instance()),
+created once and off the UI thread: constructing a PlaybackService only
+starts that in the background (warm_up()).
 """
 
 from __future__ import annotations
-import os, sys, threading, time
+import ctypes, os, subprocess, sys, threading, time
+from abc import ABC, abstractmethod
+from collections import deque
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, NamedTuple, Optional
+
+import notify
+from progressive import GrowingFile
+
+# libVLC's "size unknown" for media callbacks
+_UNKNOWN_SIZE = 2**64 - 1
+
+class PlaybackSnapshot(NamedTuple):
+    time: float    # seconds into the track
+    length: float  # seconds, 0.0 while unknown
+    state: str     # "nothingspecial", "opening", "playing", "paused", "stopped", "ended", "error"
+    volume: float  # 0.0..1.0
+
 
 def _prep_portable_vlc(vlc_dir: Optional[Path]) -> None:
     """Prepare process for a portable VLC located in vlc_dir (Windows)."""
@@ -32,111 +61,452 @@ def _prep_portable_vlc(vlc_dir: Optional[Path]) -> None:
         # Let libVLC find its plugins (decoders etc.)
         os.environ.setdefault("VLC_PLUGIN_PATH", str(vlc_dir / "plugins"))
 
-class PlaybackService:
-    def __init__(self, vlc_dir: Optional[Path] = None) -> None:
-        """
-        vlc_dir: folder that contains libvlc.dll and a 'plugins' subfolder.
-                 If None, tries system-installed VLC.
-                 When packaged (PyInstaller), you can pass
-                   Path(getattr(sys, "_MEIPASS", Path(__file__).parent)) / "vlc"
-        """
-        # If caller didn't pass one, you can optionally auto-detect a bundled path:
-        if vlc_dir is None:
-            maybe_bundle = Path(getattr(sys, "_MEIPASS", Path(__file__).parent)) / "vlc"
-            if maybe_bundle.exists():
-                vlc_dir = maybe_bundle
+def ensure_plugin_cache(vlc_dir: Path) -> Optional[float]:
+    """
+    Build plugins/plugins.dat with the bundled vlc-cache-gen if it is missing,
+    so libVLC reads one cache file instead of opening every plugin DLL at
+    startup. Returns the seconds spent, or None if nothing was (or could be) done.
+    """
+    plugins = Path(vlc_dir) / "plugins"
+    if not plugins.is_dir() or (plugins / "plugins.dat").exists():
+        return None
+    gen = next((g for g in (Path(vlc_dir) / "vlc-cache-gen.exe", Path(vlc_dir) / "vlc-cache-gen")
+                if g.exists()), None)
+    if gen is None:
+        return None
+    t0 = time.perf_counter()
+    try:
+        subprocess.run([str(gen), str(plugins)], capture_output=True, timeout=120, check=False)
+    except (OSError, subprocess.SubprocessError):
+        # read-only install or a broken tool: libVLC just scans the plugins
+        return None
+    return time.perf_counter() - t0
 
-        _prep_portable_vlc(vlc_dir)  # <-- must run BEFORE importing vlc
 
+def _default_vlc_dir() -> Optional[Path]:
+    # auto-detect a VLC bundled next to the app (or inside the PyInstaller bundle)
+    maybe_bundle = Path(getattr(sys, "_MEIPASS", Path(__file__).parent)) / "vlc"
+    return maybe_bundle if maybe_bundle.exists() else None
+
+
+# ---------- Shared libVLC instance ----------
+
+_shared: Optional[tuple] = None  # (vlc module, vlc.Instance)
+_shared_lock = threading.Lock()
+_startup: dict = {}
+
+
+def shared_instance(vlc_dir: Optional[Path] = None, warm_plugin_cache: bool = False):
+    """
+    (vlc module, vlc.Instance) shared by every player in the process, created
+    on the first call; concurrent callers wait for that one creation. vlc_dir
+    and warm_plugin_cache only matter for the first call.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = _create_instance(vlc_dir, warm_plugin_cache)
+        return _shared
+
+
+def warm_up(vlc_dir: Optional[Path] = None, warm_plugin_cache: bool = False) -> None:
+    """Create the shared instance on a background thread (no-op once it exists)."""
+    if _shared is not None:
+        return
+
+    def run():
         try:
-            import vlc  # lazy import so env & DLL dirs are set
+            shared_instance(vlc_dir, warm_plugin_cache)
         except Exception as e:
-            raise RuntimeError(
-                "Failed to import python-vlc. Did you `pip install python-vlc` "
-                "and include VLC (portable or system)?"
-            ) from e
-        
-        vlc_path = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "third_party", "vlc-3.0.21-win64", "vlc-3.0.21")
-        )
-
-        instance = vlc.Instance("--plugin-path=" + os.path.join(vlc_path, "plugins"))
-        player = instance.media_player_new()
+            # surfaced again by the first play()
+            print(f"[playback] libVLC failed to start: {e}")
+
+    threading.Thread(target=run, name="libvlc-init", daemon=True).start()
+
+
+def startup_stats() -> dict:
+    """Seconds spent bringing up libVLC (plugin cache, import, instance)."""
+    return dict(_startup)
 
+
+def _create_instance(vlc_dir: Optional[Path], warm_plugin_cache: bool):
+    if vlc_dir is None:
+        vlc_dir = _default_vlc_dir()
+    _prep_portable_vlc(vlc_dir)  # <-- must run BEFORE importing vlc
+
+    t0 = time.perf_counter()
+    cache_s = ensure_plugin_cache(vlc_dir) if (warm_plugin_cache and vlc_dir is not None) else None
+    t1 = time.perf_counter()
+    try:
+        import vlc  # lazy import so env & DLL dirs are set
+    except Exception as e:
+        raise RuntimeError(
+            "Failed to import python-vlc. Did you `pip install python-vlc` "
+            "and include VLC (portable or system)?"
+        ) from e
+    t2 = time.perf_counter()
+
+    inst_args = ["--no-video"]
+    if vlc_dir is not None:
+        inst_args.append(f"--plugin-path={Path(vlc_dir) / 'plugins'}")
+    instance = vlc.Instance(*inst_args)
+    if instance is None:
+        raise RuntimeError("libVLC could not be initialised (check the VLC install / plugin path).")
+    t3 = time.perf_counter()
+
+    _startup.update(plugin_cache=cache_s, import_s=t2 - t1, instance_s=t3 - t2, total_s=t3 - t0)
+    cache_note = f", plugin cache {cache_s:.2f} s" if cache_s is not None else ""
+    print(f"[playback] libVLC ready in {t3 - t0:.2f} s "
+          f"(import {t2 - t1:.2f} s, instance {t3 - t2:.2f} s{cache_note})")
+    return vlc, instance
+
+
+# ---------- Backends ----------
+
+# A BackendPlayer reports to its listener as listener(kind, value):
+#   kind in "opening", "playing", "paused", "stopped", "ended", "error" (value None)
+#   kind "time" / "length" with value in milliseconds
+PlayerListener = Callable[[str, Optional[int]], None]
+
+
+class BackendPlayer(ABC):
+    """One output of a backend; PlaybackService drives two of them."""
+
+    @abstractmethod
+    def set_listener(self, listener: PlayerListener) -> None:
+        ...
+
+    @abstractmethod
+    def load(self, source: Path | GrowingFile, preparse: bool = False) -> None:
+        """Set the media to play next (a file, or a download still running)."""
+
+    @abstractmethod
+    def play(self) -> None:
+        ...
+
+    @abstractmethod
+    def set_pause(self, paused: bool) -> None:
+        ...
+
+    @abstractmethod
+    def stop(self) -> None:
+        ...
+
+    @abstractmethod
+    def set_time(self, ms: int) -> None:
+        ...
+
+    @abstractmethod
+    def set_volume(self, volume: int) -> None:
+        """volume: 0..100"""
+
+
+class PlaybackBackend(ABC):
+    # True when player events arrive on a thread that must not call back into
+    # the player (libVLC): the end-of-track handoff then runs on its own thread.
+    # False: events are delivered synchronously and handled inline.
+    deferred_handoff = True
+
+    @abstractmethod
+    def new_player(self) -> BackendPlayer:
+        ...
+
+
+class VlcPlayer(BackendPlayer):
+    def __init__(self, vlc, instance) -> None:
         self._vlc = vlc
-        inst_args = ["--no-video"]
-        if vlc_dir is not None:
-            inst_args.append(f"--plugin-path={Path(vlc_dir) / 'plugins'}")
+        self._instance = instance
+        self._mp = instance.media_player_new()
+        self._listener: Optional[PlayerListener] = None
+        # reader + ctypes callbacks of the media being streamed from a download;
+        # callbacks must outlive the media, which libVLC may still close after
+        # a newer one was set, so the last few sets are kept
+        self._stream_reader = None
+        self._stream_cbs: list[tuple] = []
+
+        E = vlc.EventType
+        em = self._mp.event_manager()
+        for ev, kind in ((E.MediaPlayerOpening, "opening"), (E.MediaPlayerPlaying, "playing"),
+                         (E.MediaPlayerPaused, "paused"), (E.MediaPlayerStopped, "stopped"),
+                         (E.MediaPlayerEndReached, "ended"), (E.MediaPlayerEncounteredError, "error")):
+            em.event_attach(ev, self._emit_state, kind)
+        em.event_attach(E.MediaPlayerTimeChanged, lambda e: self._emit("time", e.u.new_time))
+        em.event_attach(E.MediaPlayerLengthChanged, lambda e: self._emit("length", e.u.new_length))
+
+    def set_listener(self, listener: PlayerListener) -> None:
+        self._listener = listener
+
+    def load(self, source: Path | GrowingFile, preparse: bool = False) -> None:
+        self._end_stream()
+        if isinstance(source, GrowingFile) and not source.done:
+            media = self._stream_media(source)
+        else:
+            media = self._instance.media_new(str(Path(source).resolve()))
+            if preparse:
+                # asynchronous: demuxer probing and tags happen before they are needed
+                media.parse_with_options(self._vlc.MediaParseFlag.local, 0)
+        self._mp.set_media(media)
+
+    def play(self) -> None:
+        self._mp.play()
+
+    def set_pause(self, paused: bool) -> None:
+        self._mp.set_pause(paused)
+
+    def stop(self) -> None:
+        # unblock a read waiting on the download, or stop() would wait for it
+        self._end_stream()
+        self._mp.stop()
+
+    def set_time(self, ms: int) -> None:
+        self._mp.set_time(ms)
+
+    def set_volume(self, volume: int) -> None:
+        self._mp.audio_set_volume(volume)
 
-        self._instance = vlc.Instance(*inst_args)
-        self._player = self._instance.media_player_new()
+    def _emit_state(self, event, kind: str) -> None:
+        self._emit(kind, None)
+
+    def _emit(self, kind: str, value) -> None:
+        listener = self._listener
+        if listener is not None:
+            listener(kind, value)
+
+    # ---------- Streaming from a running download ----------
+
+    def _stream_media(self, source: GrowingFile):
+        vlc = self._vlc
+        reader = source.open()
+
+        @vlc.CallbackDecorators.MediaOpenCb
+        def open_cb(opaque, datap, sizep):
+            datap[0] = None
+            sizep[0] = source.expected_size or _UNKNOWN_SIZE
+            return 0
+
+        @vlc.CallbackDecorators.MediaReadCb
+        def read_cb(opaque, buf, length):
+            data = reader.read(length)
+            if data is None:
+                return -1
+            ctypes.memmove(buf, data, len(data))
+            return len(data)
+
+        @vlc.CallbackDecorators.MediaSeekCb
+        def seek_cb(opaque, offset):
+            reader.seek(offset)
+            return 0
+
+        @vlc.CallbackDecorators.MediaCloseCb
+        def close_cb(opaque):
+            reader.close()
+
+        self._stream_reader = reader
+        self._stream_cbs = self._stream_cbs[-3:] + [(open_cb, read_cb, seek_cb, close_cb)]
+        return self._instance.media_new_callbacks(open_cb, read_cb, seek_cb, close_cb, None)
+
+    def _end_stream(self) -> None:
+        if self._stream_reader is not None:
+            self._stream_reader.abort()
+            self._stream_reader = None
+
+
+class VlcBackend(PlaybackBackend):
+    """python-vlc players on the process-wide libVLC instance."""
+
+    def __init__(self, vlc_dir: Optional[Path] = None, warm_plugin_cache: bool = False) -> None:
+        self.vlc_dir = vlc_dir
+        warm_up(vlc_dir, warm_plugin_cache)
+
+    def new_player(self) -> VlcPlayer:
+        # blocks only if libVLC is still starting
+        vlc, instance = shared_instance(self.vlc_dir)
+        return VlcPlayer(vlc, instance)
+
+
+class PlaybackService:
+    def __init__(self, vlc_dir: Optional[Path] = None, warm_plugin_cache: bool = False,
+                 backend: Optional[PlaybackBackend] = None) -> None:
+        """
+        vlc_dir: folder that contains libvlc.dll and a 'plugins' subfolder.
+                 If None, tries a bundled 'vlc' folder, then system-installed VLC.
+                 When packaged (PyInstaller), you can pass
+                   Path(getattr(sys, "_MEIPASS", Path(__file__).parent)) / "vlc"
+        warm_plugin_cache: generate VLC's plugin cache first if it is missing
+                 (see ensure_plugin_cache).
+        backend: use this instead of VLC (vlc_dir / warm_plugin_cache are then ignored).
+
+        Returns straight away: libVLC is brought up in the background and the
+        players are created on first use.
+        """
+        self._backend = backend if backend is not None else VlcBackend(vlc_dir, warm_plugin_cache)
+        self._player: Optional[BackendPlayer] = None
+        # second player holding the preloaded next track; the two swap roles
+        # at every gapless handoff
+        self._standby: Optional[BackendPlayer] = None
         self._lock = threading.RLock()
+        # preloaded next track, already loaded on the standby player
+        self._next: Optional[Path] = None
+        # with a deferred-handoff backend, "ended" only flags the handoff thread
+        self._ended = threading.Event()
+        self._ended_at = 0.0
+        self._handoff_pending: Optional[float] = None
+        self._transitions: deque = deque(maxlen=50)  # handoff latencies (seconds)
+        # State of the active player, fed by its events. Replaced whole (never
+        # mutated), so readers just load the attribute; writers serialize on a
+        # small lock that is never held across a player call.
+        self._snapshot = PlaybackSnapshot(0.0, 0.0, "nothingspecial", 1.0)
+        self._snap_lock = threading.Lock()
+        self._subscribers: list[Callable[[PlaybackSnapshot], None]] = []
 
         self._on_finished: Optional[Callable[[], None]] = None
-        em = self._player.event_manager()
-        em.event_attach(vlc.EventType.MediaPlayerEndReached, self._handle_end)
-        em.event_attach(vlc.EventType.MediaPlayerEncounteredError, self._handle_error)
+        self._on_track_changed: Optional[Callable[[Path], None]] = None
+
+        if self._backend.deferred_handoff:
+            threading.Thread(target=self._handoff_loop, name="playback-handoff", daemon=True).start()
+
+    def _ensure_players(self) -> None:
+        # called with self._lock held
+        if self._player is not None:
+            return
+        players = (self._backend.new_player(), self._backend.new_player())
+        vol = int(self._snapshot.volume * 100)
+        for pl in players:
+            pl.set_volume(vol)
+            pl.set_listener(lambda kind, value, pl=pl: self._handle_event(pl, kind, value))
+        self._player, self._standby = players
 
     # ---------- Public API ----------
 
-    def play(self, path: str | Path) -> None:
-        """Start playing the given file path."""
+    def play(self, path: str | Path | GrowingFile) -> None:
+        """
+        Start playing the given file path. A GrowingFile whose download is still
+        running is streamed: playback starts now and reads wait for new bytes.
+        """
         with self._lock:
-            p = str(Path(path).resolve())
-            media = self._instance.media_new(p)
-            self._player.set_media(media)
+            self._ensure_players()
+            # a preloaded "next" belonged to whatever was playing before
+            self._clear_next()
+            source = path if isinstance(path, GrowingFile) and not path.done else Path(path)
+            self._update(time=0.0, length=0.0, state="opening")
+            self._player.load(source)
             self._player.play()
 
     def pause(self) -> None:
         """Pause if playing; no-op if already paused/stopped."""
         with self._lock:
-            # pause() toggles; set_pause(True) is explicit
+            if self._player is None:
+                return
             self._player.set_pause(True)
 
     def resume(self) -> None:
         """Resume if paused; no-op if already playing."""
         with self._lock:
+            if self._player is None:
+                return
             self._player.set_pause(False)
 
     def stop(self) -> None:
         with self._lock:
+            if self._player is None:
+                return
+            self._clear_next()
             self._player.stop()
+            self._update(time=0.0, state="stopped")
+
+    def preload(self, path: str | Path) -> bool:
+        """
+        Prepare `path` as the track to follow the current one: the media is
+        created and parsed now, on the standby player, so that when the
+        current track ends playback continues without a gap and
+        on_track_changed(path) is called instead of on_finished.
+        Replaces any earlier preload. Returns False for a download still in
+        progress (those are played with play()).
+        """
+        if isinstance(path, GrowingFile):
+            if not path.done:
+                return False
+            path = Path(path)
+        p = Path(path)
+        with self._lock:
+            self._ensure_players()
+            if self._next == p:
+                return True
+            self._standby.load(p, preparse=True)
+            self._next = p
+            return True
+
+    def preloaded(self) -> Optional[Path]:
+        with self._lock:
+            return self._next
+
+    def transition_stats(self) -> dict:
+        """Gapless handoff latency (end of one track -> next one playing), in ms."""
+        with self._lock:
+            lat = list(self._transitions)
+        if not lat:
+            return {"count": 0}
+        return {
+            "count": len(lat),
+            "last_ms": lat[-1] * 1000.0,
+            "avg_ms": sum(lat) / len(lat) * 1000.0,
+            "max_ms": max(lat) * 1000.0,
+        }
 
     def seek(self, seconds: float) -> None:
         """Seek to absolute position (seconds)."""
         with self._lock:
-            self._player.set_time(int(max(0.0, seconds) * 1000))
+            if self._player is None:
+                return
+            ms = int(max(0.0, seconds) * 1000)
+            self._player.set_time(ms)
+            self._update(time=ms / 1000.0)  # don't show the old position until the player reports
 
     def set_volume(self, vol01: float) -> None:
         """Set volume in [0.0, 1.0]."""
         with self._lock:
             v = int(max(0.0, min(1.0, vol01)) * 100)
-            self._player.audio_set_volume(v)
+            if self._player is not None:
+                self._player.set_volume(v)
+                self._standby.set_volume(v)
+            # applied to the players when they are created
+            self._update(volume=v / 100.0)
 
     def get_volume(self) -> float:
-        with self._lock:
-            v = self._player.audio_get_volume()  # 0..100 or -1
-            return 0.0 if v < 0 else float(v) / 100.0
+        return self._snapshot.volume
 
     def get_position(self) -> tuple[float, float]:
         """
         Returns (current_sec, total_sec). If unknown, total_sec may be 0.0.
         """
-        with self._lock:
-            cur_ms = self._player.get_time()      # -1 if unknown
-            tot_ms = self._player.get_length()    # -1 if unknown
-            cur = 0.0 if cur_ms is None or cur_ms < 0 else cur_ms / 1000.0
-            tot = 0.0 if tot_ms is None or tot_ms < 0 else tot_ms / 1000.0
-            return (cur, tot)
+        snap = self._snapshot
+        return (snap.time, snap.length)
 
     def is_playing(self) -> bool:
-        with self._lock:
-            return bool(self._player.is_playing())
+        return self._snapshot.state == "playing"
 
     def get_state(self) -> str:
-        with self._lock:
-            st = self._player.get_state()
-            return str(st)
+        # same spelling as str(vlc.State.X), which this used to return
+        return "State." + self._snapshot.state.capitalize().replace("Nothingspecial", "NothingSpecial")
+
+    def snapshot(self) -> PlaybackSnapshot:
+        """Consistent (time, length, state, volume) of the current track."""
+        return self._snapshot
+
+    def subscribe(self, callback: Callable[[PlaybackSnapshot], None]) -> None:
+        """
+        Call callback(snapshot) on every change. Runs on the backend's event
+        thread (or the caller's, for changes made through this API): keep it
+        short and marshal GUI work onto the UI thread.
+        """
+        with self._snap_lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[PlaybackSnapshot], None]) -> None:
+        with self._snap_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
 
     def on_finished(self, callback: Optional[Callable[[], None]]) -> None:
         """
@@ -146,32 +516,128 @@ class PlaybackService:
         with self._lock:
             self._on_finished = callback
 
-    # ---------- Internal event handlers ----------
+    def on_track_changed(self, callback: Optional[Callable[[Path], None]]) -> None:
+        """
+        Register a callback called (from the handoff thread) with the path of
+        the preloaded track once it took over. Pass None to clear.
+        """
+        with self._lock:
+            self._on_track_changed = callback
+
+    # ---------- Snapshot ----------
+
+    def _update(self, **changes) -> None:
+        with self._snap_lock:
+            old = self._snapshot
+            new = old._replace(**changes)
+            if new == old:
+                return
+            self._snapshot = new
+            subscribers = list(self._subscribers)
+        notify.notify_all(subscribers, new)
+
+    # ---------- Gapless handoff ----------
+
+    def _clear_next(self) -> None:
+        if self._next is not None:
+            self._next = None
+            self._standby.stop()
+
+    def _handoff_loop(self) -> None:
+        while True:
+            self._ended.wait()
+            self._ended.clear()
+            self._handoff()
 
-    def _handle_end(self, event) -> None:  # event is a vlc.Event
-        cb = None
+    def _handoff(self) -> None:
+        changed = None
         with self._lock:
-            cb = self._on_finished
+            if self._next is not None:
+                changed, self._next = self._next, None
+                old, new = self._player, self._standby
+                new.set_volume(int(self._snapshot.volume * 100))
+                self._handoff_pending = self._ended_at
+                self._update(time=0.0, length=0.0, state="opening")
+                # swap first: the new player's first events must be seen as the active one's
+                self._player, self._standby = new, old
+                new.play()
+                old.stop()
+            cb = self._on_track_changed if changed is not None else self._on_finished
         if cb:
             try:
-                cb()
+                cb(changed) if changed is not None else cb()
             except Exception:
                 # don't crash the player on user callback errors
                 pass
 
-    def _handle_error(self, event) -> None:
-        # You can expand this to log or surface errors in your UI
-        pass
+    # ---------- Player events ----------
+
+    # With VLC these run on libVLC's event thread: no self._lock, no player
+    # calls. Events of the standby player are ignored.
+    def _handle_event(self, player: BackendPlayer, kind: str, value: Optional[int]) -> None:
+        if player is not self._player:
+            return
+        if kind == "time":
+            self._update(time=max(0, value) / 1000.0)
+        elif kind == "length":
+            self._update(length=max(0, value) / 1000.0)
+        elif kind == "ended":
+            self._update(state="ended")
+            self._ended_at = time.perf_counter()
+            if self._backend.deferred_handoff:
+                self._ended.set()
+            else:
+                self._handoff()
+        elif kind == "playing":
+            self._update(state="playing")
+            started = self._handoff_pending
+            if started is not None:
+                self._handoff_pending = None
+                self._transitions.append(time.perf_counter() - started)
+        else:
+            self._update(state=kind)
 
 
 # ---------- Ad-hoc CLI test ----------
+def _bench(n_tracks: int) -> None:
+    """Gapless queue throughput on the simulated backend (no audio, no real time)."""
+    from sim_backend import SimulatedBackend
+
+    backend = SimulatedBackend()
+    svc = PlaybackService(backend=backend)
+    queue = [Path(f"track{i:06d}.m4a") for i in range(n_tracks)]
+    pos = {"i": 0}
+
+    def changed(path):
+        pos["i"] += 1
+        if pos["i"] + 1 < len(queue):
+            svc.preload(queue[pos["i"] + 1])
+
+    svc.on_track_changed(changed)
+    t0 = time.perf_counter()
+    svc.play(queue[0])
+    svc.preload(queue[1])
+    while backend.finish_current():
+        pass
+    dt = time.perf_counter() - t0
+    stats = svc.transition_stats()
+    print(f"{backend.ended_count} tracks in {dt:.3f} s ({backend.ended_count / dt:,.0f} tracks/s), "
+          f"{backend.now_ms / 3_600_000:.1f} h of simulated audio; "
+          f"handoff avg {stats.get('avg_ms', 0.0) * 1000:.1f} us")
+
+
 if __name__ == "__main__":
     """
     Quick manual test:
     python playback_service.py "path/to/song.m4a"
+    python playback_service.py --bench 10000     (simulated backend)
     """
     if len(sys.argv) < 2:
-        print("Usage: python playback_service.py <audio-file>")
+        print("Usage: python playback_service.py <audio-file> | --bench <tracks>")
+        sys.exit(0)
+
+    if sys.argv[1] == "--bench":
+        _bench(int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
         sys.exit(0)
 
     audio = Path(sys.argv[1])
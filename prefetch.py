@@ -0,0 +1,113 @@
+# prefetch.py
+"""
+Look-ahead for the play queue: the next few tracks are made ready before
+they are due, so a track change never waits on the network or the disk.
+
+- a query (str) still to be resolved is downloaded via search.find_or_download
+- every file is then warmed into the OS page cache (posix_fadvise WILLNEED
+  where available, otherwise a plain sequential read)
+
+All work runs as PREFETCH jobs on the download scheduler, behind anything
+the user asked for. Items that drop out of the look-ahead window are
+cancelled.
+"""
+
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+import scheduler
+
+# How many upcoming tracks to prepare
+DEFAULT_AHEAD = 3
+
+_READ_CHUNK = 1 << 20
+
+
+def warm_file(path: str | Path) -> int:
+    """Pull a file into the page cache. Returns the bytes hinted or read."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if hasattr(os, "posix_fadvise"):
+            # asynchronous readahead by the kernel; no copy through Python
+            os.posix_fadvise(f.fileno(), 0, size, os.POSIX_FADV_WILLNEED)
+            return size
+        read = 0
+        while True:
+            scheduler.check_cancelled()
+            chunk = f.read(_READ_CHUNK)
+            if not chunk:
+                return read
+            read += len(chunk)
+
+
+class Prefetcher:
+    def __init__(self, ahead: int = DEFAULT_AHEAD, remember: int = 64) -> None:
+        self.ahead = ahead
+        # re-entrant: cancelling a job runs its done-callback on this thread
+        self._lock = threading.RLock()
+        self._jobs: dict[str, scheduler.Job] = {}
+        # keys already prepared (LRU), and queries resolved to files
+        self._ready: OrderedDict[str, Path] = OrderedDict()
+        self._remember = remember
+
+    @staticmethod
+    def _key(item: str | Path) -> str:
+        return str(item) if isinstance(item, Path) else f"q:{item}"
+
+    def update(self, upcoming: Iterable[str | Path]) -> None:
+        """
+        Set the tracks coming up next (Paths, or queries still to resolve),
+        nearest first. Only the first `ahead` are prepared.
+        """
+        window = list(upcoming)[: self.ahead]
+        keys = [self._key(item) for item in window]
+        with self._lock:
+            for key in list(self._jobs):
+                if key not in keys:
+                    self._jobs.pop(key).cancel()
+            for key, item in zip(keys, window):
+                if key in self._ready or key in self._jobs:
+                    continue
+                job = scheduler.submit(self._prepare, item, priority=scheduler.PREFETCH,
+                                       label=f"prefetch {item}")
+                self._jobs[key] = job
+                job.future.add_done_callback(lambda f, key=key: self._finished(key, f))
+
+    def resolved(self, item: str | Path) -> Optional[Path]:
+        """The prepared file for `item`, if the prefetcher got to it."""
+        with self._lock:
+            return self._ready.get(self._key(item))
+
+    def cancel(self) -> None:
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+            self._jobs.clear()
+
+    # ---------- Internals ----------
+
+    def _prepare(self, item: str | Path) -> Path:
+        if isinstance(item, Path):
+            path = item
+        else:
+            import search
+            path = Path(search.find_or_download(item))
+        warm_file(path)
+        with self._lock:
+            key = self._key(item)
+            self._ready[key] = path
+            self._ready.move_to_end(key)
+            while len(self._ready) > self._remember:
+                self._ready.popitem(last=False)
+        return path
+
+    def _finished(self, key: str, future) -> None:
+        with self._lock:
+            job = self._jobs.get(key)
+            # a cancelled job's key may already belong to a newer job
+            if job is not None and job.future is future:
+                del self._jobs[key]
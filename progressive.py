@@ -0,0 +1,180 @@
+# progressive.py
+"""
+Play-while-downloading support.
+
+A GrowingFile stands for an audio file that a download is still writing
+(yt-dlp with nopart, so bytes land under the final name). The fetcher's
+progress hook reports how much is on disk; readers opened with open() block
+for bytes that have not arrived yet instead of hitting a premature EOF, which
+is what lets VLC start on the first few hundred KiB.
+"""
+
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Optional
+
+import scheduler
+
+# Bytes on disk before playback may start (~8 s of 128 kbit/s AAC)
+MIN_BUFFER_BYTES = 128 * 1024
+
+
+class GrowingFile:
+    def __init__(self, label: str = "") -> None:
+        self.label = label
+        self.path: Optional[str] = None
+        self.written = 0
+        self.expected_size: Optional[int] = None
+        self.result = None             # DownloadResult once finished
+        self.error: Optional[BaseException] = None
+        self.started = time.perf_counter()
+        self.ready_after: Optional[float] = None  # seconds until wait_ready() succeeded
+        # joined a download that is not streamed: no bytes come before it ends
+        self.joined = False
+        self._followers: list[GrowingFile] = []
+        self._done = False
+        self._cond = threading.Condition()
+
+    # ---------- Writer side (fetcher) ----------
+
+    def update(self, path: str, written: int, total: Optional[int] = None) -> None:
+        with self._cond:
+            self.path = path
+            self.written = max(self.written, written or 0)
+            if total:
+                self.expected_size = total
+            self._cond.notify_all()
+            followers = list(self._followers)
+        for f in followers:
+            f.update(path, written, total)
+
+    def follow(self, owner: Optional["GrowingFile"]) -> None:
+        """
+        This download joined one already running for the same track (see
+        fetcher._single_flight). Mirror the owner's progress; with no owner
+        stream nothing lands on disk under the final name before the end, so
+        wait_ready() waits for the shared result instead of timing out.
+        """
+        if owner is None:
+            with self._cond:
+                self.joined = True
+                self._cond.notify_all()
+                followers = list(self._followers)
+            for f in followers:
+                f.follow(None)
+            return
+        with owner._cond:
+            owner._followers.append(self)
+            path, written, total, joined = owner.path, owner.written, owner.expected_size, owner.joined
+        if joined:
+            self.follow(None)
+        elif path:
+            self.update(path, written, total)
+
+    def finish(self, result) -> None:
+        """The download is complete; `result` is the fetcher's DownloadResult."""
+        with self._cond:
+            self.result = result
+            if result is not None:
+                self.path = self.path or str(result)
+                if result.size:
+                    self.written = self.expected_size = result.size
+            self._done = True
+            self._cond.notify_all()
+
+    def fail(self, error: BaseException) -> None:
+        with self._cond:
+            self.error = error
+            self._done = True
+            self._cond.notify_all()
+
+    # ---------- Reader side ----------
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def wait_ready(self, min_bytes: int = MIN_BUFFER_BYTES, timeout: float = 60.0) -> bool:
+        """
+        Block until `min_bytes` are on disk or the download ended (check .error).
+        Honours the calling scheduler job's cancel token. False on timeout; a
+        joined download (see follow()) has no timeout, it is still running.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._done and not (self.path and self.written >= min_bytes):
+                left = deadline - time.monotonic()
+                if left <= 0 and not self.joined:
+                    return False
+                self._cond.wait(0.1 if self.joined else min(left, 0.1))
+                scheduler.check_cancelled()
+            if self.ready_after is None:
+                self.ready_after = time.perf_counter() - self.started
+        print(f"[progressive] {self.label or self.path}: ready after {self.ready_after:.2f} s "
+              f"({self.written // 1024} KiB buffered)")
+        return True
+
+    def open(self) -> "GrowingReader":
+        return GrowingReader(self)
+
+    def __fspath__(self) -> str:
+        if self.path is None:
+            raise FileNotFoundError("download has not written anything yet")
+        return self.path
+
+
+class GrowingReader:
+    """File-like reader over a GrowingFile; read() waits for missing bytes."""
+
+    def __init__(self, source: GrowingFile) -> None:
+        self.source = source
+        self.pos = 0
+        self._fh = None
+        self._aborted = False
+
+    def abort(self) -> None:
+        """Make a blocked (or any later) read() return None, e.g. when playback stops."""
+        self._aborted = True
+        with self.source._cond:
+            self.source._cond.notify_all()
+
+    def seek(self, offset: int) -> None:
+        self.pos = max(0, offset)
+
+    def read(self, size: int) -> Optional[bytes]:
+        """Up to `size` bytes at the current position; b"" at the real EOF, None if aborted."""
+        src = self.source
+        with src._cond:
+            while not self._aborted and not src.done and src.written <= self.pos:
+                src._cond.wait(0.25)
+            if self._aborted:
+                return None
+            avail = src.written - self.pos
+            path = src.path
+        if avail <= 0 or path is None:
+            return b""
+        if self._fh is None:
+            self._fh = open(path, "rb")
+        self._fh.seek(self.pos)
+        data = self._fh.read(min(size, avail))
+        self.pos += len(data)
+        return data
+
+    def close(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except OSError:
+                pass
+            self._fh = None
+
+
+def discard_partial(path: Optional[str]) -> None:
+    """Remove what a failed or cancelled nopart download left behind."""
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
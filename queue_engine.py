@@ -0,0 +1,294 @@
+# queue_engine.py
+"""
+Play queue: what plays next, what played before.
+
+The play order is a doubly linked list of nodes with a cursor on the current
+track. Nodes before the cursor are the history (previous() walks back,
+bounded by history_limit), nodes after it are the upcoming order. When the
+upcoming order runs out, a whole new cycle is appended: every track once, in
+a fresh Fisher-Yates permutation when shuffling. The first few slots of a
+shuffled cycle are drawn from tracks that are not among the last few
+already queued before it (played or not: peek() draws cycles early), so
+nothing repeats straight away across the cycle boundary.
+
+next() / previous() / insert_next() / play_now() / append() are O(1);
+remove() is O(number of times the item is queued), via an item -> nodes
+index. A new cycle costs O(n) once per n tracks played.
+
+Items can also be tagged with extra keys (a file's folder, its (st_dev,
+st_ino), a catalog track id...) that the caller works out wherever it likes;
+remove_key() then drops every item under a key without comparing against
+the whole queue.
+"""
+
+from __future__ import annotations
+import random
+from typing import Generic, Hashable, Iterable, Optional, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+
+class _Node:
+    __slots__ = ("item", "prev", "next", "played")
+
+    def __init__(self, item) -> None:
+        self.item = item
+        self.prev: Optional[_Node] = None
+        self.next: Optional[_Node] = None
+        self.played = False  # at or behind the cursor
+
+
+class QueueEngine(Generic[T]):
+    def __init__(self, items: Iterable[T] = (), shuffle: bool = False, loop: bool = True,
+                 recent_exclusion: int = 20, history_limit: int = 500,
+                 rng: Optional[random.Random] = None) -> None:
+        """
+        recent_exclusion: a new shuffled cycle doesn't start with any of the
+            last this-many tracks queued before it (capped at a quarter of
+            the queue, so cycles still mix).
+        history_limit: how many played entries previous() can walk back.
+        rng: random source, e.g. random.Random(seed) for a reproducible order.
+        """
+        self.recent_exclusion = recent_exclusion
+        self.history_limit = history_limit
+        self._rng = rng or random.Random()
+        self.reset(items, shuffle=shuffle, loop=loop)
+
+    # ---------- Setup ----------
+
+    def reset(self, items: Iterable[T], shuffle: Optional[bool] = None,
+              loop: Optional[bool] = None) -> None:
+        """Replace the tracks and forget the order / history."""
+        if shuffle is not None:
+            self.shuffle = shuffle
+        if loop is not None:
+            self.loop = loop
+        # dict as an insertion-ordered set: the unshuffled order
+        self._tracks: dict[T, None] = dict.fromkeys(items)
+        self._nodes: dict[T, set[_Node]] = {}
+        # tag key -> items, and item -> its keys (to untag on removal)
+        self._tagged: dict[Hashable, set[T]] = {}
+        self._keys: dict[T, set[Hashable]] = {}
+        self._head: Optional[_Node] = None
+        self._tail: Optional[_Node] = None
+        self._cursor: Optional[_Node] = None
+        self._behind = 0  # played nodes before the cursor
+        self.cycles = 0
+
+    def set_shuffle(self, shuffle: bool) -> None:
+        """Switch mode: the tracks still to come are reordered, history is kept."""
+        if shuffle == self.shuffle:
+            return
+        self.shuffle = shuffle
+        upcoming = []
+        node = self._cursor.next if self._cursor is not None else self._head
+        while node is not None:
+            nxt = node.next
+            upcoming.append(node.item)
+            self._unlink(node)
+            node = nxt
+        # once each; entries of a cycle drawn early by peek() come back with the next _extend()
+        upcoming = list(dict.fromkeys(upcoming))
+        if shuffle:
+            self._shuffle(upcoming, self._tail)
+        else:
+            rank = {t: i for i, t in enumerate(self._tracks)}
+            upcoming.sort(key=lambda t: rank.get(t, len(rank)))
+        anchor = self._tail
+        for item in upcoming:
+            new = _Node(item)
+            self._link_after(anchor, new)
+            anchor = new
+
+    # ---------- Reading ----------
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._tracks
+
+    @property
+    def tracks(self) -> list[T]:
+        return list(self._tracks)
+
+    @property
+    def current(self) -> Optional[T]:
+        return self._cursor.item if self._cursor is not None else None
+
+    def peek(self, n: int) -> list[T]:
+        """The next n tracks in play order, without moving (draws new cycles if needed)."""
+        out: list[T] = []
+        node = self._cursor
+        while len(out) < n:
+            nxt = node.next if node is not None else self._head
+            if nxt is None:
+                if not self._extend():
+                    break
+                nxt = node.next if node is not None else self._head
+            out.append(nxt.item)
+            node = nxt
+        return out
+
+    # ---------- Moving ----------
+
+    def next(self) -> Optional[T]:
+        """Advance to the next track and return it; None when a non-looping queue is done."""
+        nxt = self._cursor.next if self._cursor is not None else self._head
+        if nxt is None:
+            if not self._extend():
+                return None
+            nxt = self._cursor.next if self._cursor is not None else self._head
+        if self._cursor is not None:
+            self._behind += 1
+        self._cursor = nxt
+        nxt.played = True
+        self._trim_history()
+        return nxt.item
+
+    def previous(self) -> Optional[T]:
+        """Step back to the track played before this one (None at the start of history)."""
+        if self._cursor is None or self._cursor.prev is None:
+            return None
+        self._cursor.played = False
+        self._cursor = self._cursor.prev
+        self._behind -= 1
+        return self._cursor.item
+
+    # ---------- Editing ----------
+
+    def insert_next(self, item: T) -> None:
+        """Queue item to play right after the current track (and in later cycles)."""
+        self._tracks.setdefault(item, None)
+        self._link_after(self._cursor, _Node(item))
+
+    def play_now(self, item: T) -> T:
+        """
+        Make item the current track without touching the upcoming order or
+        later cycles (e.g. the player moved to it on its own), and return it.
+        """
+        self._link_after(self._cursor, _Node(item))
+        return self.next()
+
+    def append(self, item: T) -> None:
+        """Add item at the end of the upcoming order (and to later cycles)."""
+        self._tracks.setdefault(item, None)
+        if self._tail is None:
+            # no order drawn yet: the first cycle will include it
+            return
+        self._link_after(self._tail, _Node(item))
+
+    def tag(self, item: T, key: Hashable) -> None:
+        """File item under key as well (ignored if item is no longer queued)."""
+        if item not in self._tracks:
+            return
+        self._tagged.setdefault(key, set()).add(item)
+        self._keys.setdefault(item, set()).add(key)
+
+    def keys_of(self, item: T) -> set[Hashable]:
+        return set(self._keys.get(item, ()))
+
+    def remove_key(self, key: Hashable) -> int:
+        """remove() every item tagged with key. Returns how many entries were unlinked."""
+        return sum(self.remove(item) for item in list(self._tagged.get(key, ())))
+
+    def remove(self, item: T) -> int:
+        """
+        Drop item from the queue and from future cycles. The current entry
+        stays (it is playing); history and upcoming entries go. Returns how
+        many entries were unlinked.
+        """
+        self._tracks.pop(item, None)
+        for key in self._keys.pop(item, ()):
+            items = self._tagged[key]
+            items.discard(item)
+            if not items:
+                del self._tagged[key]
+        nodes = self._nodes.get(item)
+        if not nodes:
+            return 0
+        removed = 0
+        for node in list(nodes):
+            if node is self._cursor:
+                continue
+            self._unlink(node)
+            removed += 1
+        return removed
+
+    # ---------- Internals ----------
+
+    def _extend(self) -> bool:
+        # append a new cycle after the tail; False if there is nothing (more) to play
+        if not self._tracks or (self.cycles > 0 and not self.loop):
+            return False
+        order = list(self._tracks)
+        if self.shuffle:
+            self._shuffle(order, self._tail)
+        node = self._tail
+        for item in order:
+            new = _Node(item)
+            self._link_after(node, new)
+            node = new
+        self.cycles += 1
+        return True
+
+    def _shuffle(self, order: list, anchor: Optional[_Node]) -> None:
+        # order is about to be linked after anchor: shuffle it in place, with
+        # the first k slots drawn only from tracks not among the k entries
+        # just before anchor
+        rng = self._rng
+        n = len(order)
+        k = min(self.recent_exclusion, max(1, n // 4)) if n > 1 else 0
+        excluded = set()
+        node = anchor
+        while node is not None and len(excluded) < k:
+            excluded.add(node.item)
+            node = node.prev
+        allowed = [t for t in order if t not in excluded]
+        head = rng.sample(allowed, min(k, len(allowed)))
+        taken = set(head)
+        rest = [t for t in order if t not in taken]
+        for i in range(len(rest) - 1, 0, -1):  # Fisher-Yates
+            j = rng.randrange(i + 1)
+            rest[i], rest[j] = rest[j], rest[i]
+        order[:] = head + rest
+
+    def _link_after(self, anchor: Optional[_Node], node: _Node) -> None:
+        if anchor is None:
+            # at the very front (before the first track / nothing played yet)
+            node.next = self._head
+            if self._head is not None:
+                self._head.prev = node
+            self._head = node
+            if self._tail is None:
+                self._tail = node
+        else:
+            node.prev, node.next = anchor, anchor.next
+            if anchor.next is not None:
+                anchor.next.prev = node
+            else:
+                self._tail = node
+            anchor.next = node
+        self._nodes.setdefault(node.item, set()).add(node)
+
+    def _unlink(self, node: _Node) -> None:
+        if node.prev is not None:
+            node.prev.next = node.next
+        else:
+            self._head = node.next
+        if node.next is not None:
+            node.next.prev = node.prev
+        else:
+            self._tail = node.prev
+        if node.played:
+            self._behind -= 1
+        nodes = self._nodes.get(node.item)
+        if nodes is not None:
+            nodes.discard(node)
+            if not nodes:
+                del self._nodes[node.item]
+        node.prev = node.next = None
+
+    def _trim_history(self) -> None:
+        while self._behind > self.history_limit and self._head is not None:
+            self._unlink(self._head)
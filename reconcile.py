@@ -0,0 +1,103 @@
+# reconcile.py
+"""
+Keyed reconciliation of a displayed list against a new list of keys.
+
+KeyedReconciler remembers which keys are on screen, in which order, and on
+update() works out the smallest set of edits to reach the new list: keys
+that are gone are removed, new keys inserted, and of the keys on both sides
+only those outside the longest run already in the right relative order
+(a longest increasing subsequence) are moved. Everything else is left
+alone, so refreshing a sidebar of 500 playlists after one was created
+touches one widget.
+
+The widget work is done by two callbacks, so the same reconciler drives
+packed buttons and Listbox rows alike:
+
+    insert(index, key)   show key at position index
+    remove(index, key)   take away the key shown at position index
+
+`keys` still holds the state before the edit while a callback runs, so
+keys[index] (if any) is the entry the new one goes in front of. A move is a
+remove followed by an insert.
+"""
+
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Callable, Generic, Hashable, NamedTuple, Sequence, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class Edits(NamedTuple):
+    added: int
+    removed: int
+    moved: int
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.moved)
+
+
+def _stable(seq: list[int]) -> set[int]:
+    """Values of one longest increasing subsequence of seq (O(n log n))."""
+    tails: list[int] = []      # smallest tail value of an increasing run of each length
+    tail_at: list[int] = []    # index in seq of that tail
+    prev = [-1] * len(seq)
+    for i, v in enumerate(seq):
+        j = bisect_left(tails, v)
+        if j == len(tails):
+            tails.append(v)
+            tail_at.append(i)
+        else:
+            tails[j] = v
+            tail_at[j] = i
+        prev[i] = tail_at[j - 1] if j > 0 else -1
+    out = set()
+    i = tail_at[-1] if tail_at else -1
+    while i >= 0:
+        out.add(seq[i])
+        i = prev[i]
+    return out
+
+
+class KeyedReconciler(Generic[K]):
+    def __init__(self, insert: Callable[[int, K], None], remove: Callable[[int, K], None]) -> None:
+        self.keys: list[K] = []
+        self._insert = insert
+        self._remove = remove
+
+    def update(self, new: Sequence[K]) -> Edits:
+        """Bring the display in line with `new` (unique keys) and report what it took."""
+        new = list(new)
+        wanted = set(new)
+
+        # 1) drop keys that are gone, from the back so indices stay valid
+        removed = 0
+        for i in range(len(self.keys) - 1, -1, -1):
+            key = self.keys[i]
+            if key not in wanted:
+                self._remove(i, key)
+                del self.keys[i]
+                removed += 1
+
+        # 2) keys on both sides that already sit in the right relative order stay put
+        old_pos = {k: i for i, k in enumerate(self.keys)}
+        stay = _stable([old_pos[k] for k in new if k in old_pos])
+
+        # 3) walk the new order, placing every other key right after its
+        #    predecessor (already placed: either staying, or placed the same way)
+        added = moved = 0
+        for i, key in enumerate(new):
+            pos = old_pos.get(key)
+            if pos is not None and pos in stay:
+                continue
+            if pos is not None:
+                j = self.keys.index(key)
+                self._remove(j, key)
+                del self.keys[j]
+                moved += 1
+            else:
+                added += 1
+            at = self.keys.index(new[i - 1]) + 1 if i > 0 else 0
+            self._insert(at, key)
+            self.keys.insert(at, key)
+        return Edits(added, removed, moved)
@@ -0,0 +1,259 @@
+# scheduler.py
+"""
+Central download scheduler: every download (play now, add to playlist,
+prefetch, batch resolve) goes through one fixed pool of worker threads, so
+rapid clicks queue up instead of starting unbounded yt-dlp sessions.
+
+Jobs run lowest priority value first (PLAY_NOW < ADD_TO_PLAYLIST < PREFETCH),
+FIFO within a priority. Each job carries a CancelToken: a queued job that is
+cancelled never starts, and a running one is stopped at the next yt-dlp
+progress callback (fetcher calls check_cancelled() from its progress hook).
+"""
+
+from __future__ import annotations
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+PLAY_NOW = 0
+ADD_TO_PLAYLIST = 1
+PREFETCH = 2
+
+PRIORITY_NAMES = {PLAY_NOW: "play_now", ADD_TO_PLAYLIST: "add_to_playlist", PREFETCH: "prefetch"}
+
+DEFAULT_WORKERS = 3
+
+
+class Cancelled(Exception):
+    """Raised inside a job whose token was cancelled."""
+
+
+class CancelToken:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise Cancelled()
+
+
+# token of the job running on this thread (None outside scheduler workers)
+_local = threading.local()
+
+
+def current_token() -> Optional[CancelToken]:
+    return getattr(_local, "token", None)
+
+
+def check_cancelled() -> None:
+    """Raise Cancelled if the job running on this thread has been cancelled."""
+    token = current_token()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class Job:
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict, priority: int,
+                 label: str, token: CancelToken) -> None:
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.label = label
+        self.token = token
+        self.future: Future = Future()
+        self.submitted = time.perf_counter()
+
+    def cancel(self) -> None:
+        """Cancel the job: drops it if still queued, stops it at the next check if running."""
+        self.token.cancel()
+        self.future.cancel()
+
+    def result(self, timeout: Optional[float] = None):
+        return self.future.result(timeout)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+
+class DownloadScheduler:
+    def __init__(self, workers: int = DEFAULT_WORKERS) -> None:
+        self.workers = max(1, workers)
+        self._heap: list[tuple[int, int, Job]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._running: set[Job] = set()
+        self._closed = False
+        # counters for stats()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._wait_total = {p: 0.0 for p in PRIORITY_NAMES}
+        self._wait_count = {p: 0 for p in PRIORITY_NAMES}
+
+    # ---------- Public API ----------
+
+    def submit(self, fn: Callable, *args, priority: int = ADD_TO_PLAYLIST,
+               label: str = "", token: Optional[CancelToken] = None, **kwargs) -> Job:
+        """Queue fn(*args, **kwargs); returns the Job (its .future holds the result)."""
+        job = Job(fn, args, kwargs, priority, label or getattr(fn, "__name__", "job"),
+                  token or CancelToken())
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("scheduler is shut down")
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._submitted += 1
+            self._start_workers()
+            self._cond.notify()
+        return job
+
+    def spawn_child(self, fn: Callable, *args, label: str = "", **kwargs) -> Job:
+        """
+        Run fn(*args, **kwargs) on a thread of its own, as a child of the job
+        running on this thread: it shares that job's cancel token and priority
+        but takes no worker slot, so a job can hand off work that outlives it
+        without waiting behind (or deadlocking on) the pool it occupies.
+        """
+        token = current_token() or CancelToken()
+        parent = getattr(_local, "job", None)
+        job = Job(fn, args, kwargs, parent.priority if parent else PLAY_NOW,
+                  label or getattr(fn, "__name__", "job"), token)
+        job.future.set_running_or_notify_cancel()
+        with self._cond:
+            self._submitted += 1
+            self._running.add(job)
+        threading.Thread(target=self._execute, args=(job,), name=f"child-{job.label}",
+                         daemon=True).start()
+        return job
+
+    def cancel_all(self, priority: Optional[int] = None) -> int:
+        """Cancel queued and running jobs (of one priority, or all). Returns how many."""
+        with self._cond:
+            jobs = [j for _, _, j in self._heap] + list(self._running)
+        n = 0
+        for job in jobs:
+            if priority is None or job.priority == priority:
+                if not job.token.cancelled:
+                    job.cancel()
+                    n += 1
+        return n
+
+    def stats(self) -> dict:
+        """Queue depth per priority, running jobs, counters and average queue wait."""
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for prio, _, job in self._heap:
+                if not job.token.cancelled:
+                    depth[PRIORITY_NAMES.get(prio, str(prio))] += 1
+            return {
+                "workers": self.workers,
+                "queued": depth,
+                "running": [(PRIORITY_NAMES.get(j.priority, j.priority), j.label) for j in self._running],
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+                "avg_wait": {
+                    PRIORITY_NAMES[p]: (self._wait_total[p] / self._wait_count[p]) if self._wait_count[p] else 0.0
+                    for p in PRIORITY_NAMES
+                },
+            }
+
+    def shutdown(self, cancel: bool = True) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if cancel:
+            self.cancel_all()
+
+    # ---------- Workers ----------
+
+    def _start_workers(self) -> None:
+        # called with the lock held; threads are started lazily
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._worker, name=f"download-{len(self._threads) + 1}",
+                                 daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def _next_job(self) -> Optional[Job]:
+        with self._cond:
+            while True:
+                while self._heap:
+                    prio, _, job = heapq.heappop(self._heap)
+                    if job.token.cancelled or not job.future.set_running_or_notify_cancel():
+                        self._cancelled += 1
+                        continue
+                    if prio in self._wait_total:
+                        self._wait_total[prio] += time.perf_counter() - job.submitted
+                        self._wait_count[prio] += 1
+                    self._running.add(job)
+                    return job
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _worker(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._execute(job)
+
+    def _execute(self, job: Job) -> None:
+        _local.token = job.token
+        _local.job = job
+        try:
+            job.token.raise_if_cancelled()
+            result = job.fn(*job.args, **job.kwargs)
+        except Cancelled as e:
+            outcome = "cancelled"
+            job.future.set_exception(e)
+        except BaseException as e:
+            outcome = "failed"
+            job.future.set_exception(e)
+        else:
+            outcome = "completed"
+            job.future.set_result(result)
+        finally:
+            _local.token = None
+            _local.job = None
+        with self._cond:
+            self._running.discard(job)
+            if outcome == "cancelled":
+                self._cancelled += 1
+            elif outcome == "failed":
+                self._failed += 1
+            else:
+                self._completed += 1
+
+
+_scheduler: Optional[DownloadScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> DownloadScheduler:
+    """Process-wide scheduler, created on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = DownloadScheduler()
+        return _scheduler
+
+
+def submit(fn: Callable, *args, priority: int = ADD_TO_PLAYLIST, label: str = "",
+           token: Optional[CancelToken] = None, **kwargs) -> Job:
+    """Shortcut for get_scheduler().submit(...)."""
+    return get_scheduler().submit(fn, *args, priority=priority, label=label, token=token, **kwargs)
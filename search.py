@@ -1,13 +1,24 @@
 # search.py  (renamed from player.py so gui can `import search`)
 import os
-import re
+import shutil
 import sys
 import time
+from concurrent.futures import FIRST_COMPLETED, wait
 from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+import catalog
+import library_index
+import progressive as progressive_mod
+import scheduler
 
 MUSIC_DIR = Path(__file__).resolve().parent / "music"
 MUSIC_DIR.mkdir(parents=True, exist_ok=True)
 
+# Typo-tolerant local matches scoring at least this (0..1) are used instead of
+# downloading again; raise it if the wrong local song gets picked
+FUZZY_THRESHOLD = 0.75
+
 # NOTE: If the GUI (PlaybackService) is responsible for playback,
 # you can remove VLC entirely from this module. Keeping it here
 # only for the CLI/back-compat `search_and_play`.
@@ -18,33 +29,27 @@ except Exception:
 
 
 def _normalize(s: str) -> str:
-    s = s.strip().lower()
-    s = re.sub(r"\s+", " ", s)
-    return s
+    return library_index.normalize(s)
 
 
-def _candidate_audio_files():
-    exts = {".m4a", ".webm", ".mp4", ".mp3", ".opus"}
-    for p in MUSIC_DIR.iterdir():
-        if p.is_file() and p.suffix.lower() in exts:
-            yield p
+def _library() -> library_index.LibraryIndex:
+    return library_index.index_for(MUSIC_DIR)
 
 
 def _find_local_match(song_name: str) -> Path | None:
-    q = _normalize(song_name)
+    return _library().find(song_name)
 
-    # Exact (normalized) stem match first
-    for path in _candidate_audio_files():
-        stem_norm = _normalize(path.stem)
-        if stem_norm == q:
-            return path
 
-    # Fallback: substring either way
-    for path in _candidate_audio_files():
-        stem_norm = _normalize(path.stem)
-        if q in stem_norm or stem_norm in q:
-            return path
+def _find_fuzzy_match(index: library_index.LibraryIndex, song_name: str) -> Path | None:
+    hits = index.fuzzy(song_name, threshold=FUZZY_THRESHOLD, limit=1)
+    return hits[0].path if hits else None
 
+
+def _find_catalog_match(song_name: str) -> Path | None:
+    """Best ranked full-text hit (every query word matched) that still exists on disk."""
+    for hit in catalog.get_catalog().search(song_name, limit=5):
+        if hit.path.suffix.lower() in library_index.AUDIO_EXTS and hit.path.exists():
+            return hit.path
     return None
 
 
@@ -54,7 +59,7 @@ def exists_in_library(song_name: str) -> bool:
 
 def fetch_with_fetcher(song_name: str) -> Path:
     """
-    Call your downloader. Assumes fetcher.make_yt_search returns a string path.
+    Call your downloader. fetcher.make_yt_search returns a path-like DownloadResult.
     """
     import fetcher
     result = fetcher.make_yt_search(song_name)
@@ -65,7 +70,7 @@ def fetch_with_fetcher(song_name: str) -> Path:
 
 # ---------- NEW: pure resolve method (no playback) ----------
 def download_youtube_video(url_or_query, output_dir="videos", filename=None):
-    import yt_dlp
+    import fetcher
     import os
 
     os.makedirs(output_dir, exist_ok=True)
@@ -81,30 +86,81 @@ def download_youtube_video(url_or_query, output_dir="videos", filename=None):
         "restrictfilenames": True,
     }
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    # Borrow a pooled session instead of building a new YoutubeDL each time
+    with fetcher.borrow_session(ydl_opts) as (ydl, _reused):
         result = ydl.download([url_or_query])
     return outtmpl  # Returns the intended output path
 
-def find_or_download(song_name: str) -> Path:
+def find_local(song_name: str) -> Path | None:
+    """Local-only part of find_or_download(): never touches the network."""
+    local = _library().find_exact(song_name)
+    if local:
+        return local
+
+    # Ranked full-text search over title/artist/filename (music/ and playlists)
+    # beats the arbitrary first substring hit below
+    local = _find_catalog_match(song_name) or _find_local_match(song_name)
+    if local:
+        return local
+
+    # Last local chance: typo-tolerant match above FUZZY_THRESHOLD
+    return _find_fuzzy_match(_library(), song_name)
+
+
+def find_or_download(song_name: str, progressive: bool = False):
     """
     Return a local Path for `song_name`. If not present, download it.
     DOES NOT play the file. This is what the GUI should call.
+
+    progressive=True: for a download, return as soon as the first
+    progressive_mod.MIN_BUFFER_BYTES are on disk, as a GrowingFile that
+    PlaybackService.play() can start on while the rest keeps downloading.
+    A download that finishes before then returns a plain Path as usual.
     """
-    local = _find_local_match(song_name)
+    local = find_local(song_name)
     if local:
         return local
 
-    downloaded = fetch_with_fetcher(song_name)
-    return downloaded
+    if not progressive:
+        return fetch_with_fetcher(song_name)
+    return _start_progressive(song_name)
 
-def find_or_download_in_playlist(playlist_name: str, song_name: str) -> Path:
-    """
-    Like find_or_download(), but operates entirely within
-    playlists/<playlist_name>/ instead of MUSIC_DIR.
 
-    Creates the folder if needed, searches there, and downloads
-    into it if not found.
-    """
+def _start_progressive(song_name: str):
+    import fetcher
+
+    stream = progressive_mod.GrowingFile(song_name)
+
+    def run():
+        try:
+            result = fetcher.make_yt_search(song_name, stream=stream)
+        except BaseException as e:
+            stream.fail(e)
+            raise
+        stream.finish(result)
+        return result
+
+    # The download runs as a child of the calling job (same cancel token, no
+    # extra worker slot: waiting on a queued job from inside the pool could
+    # deadlock), so it keeps going after we hand the partial file back
+    job = scheduler.get_scheduler().spawn_child(run, label=song_name)
+    try:
+        ready = stream.wait_ready()
+    except scheduler.Cancelled:
+        job.cancel()
+        raise
+    if stream.error is not None:
+        raise stream.error
+    if stream.done:
+        if stream.result is None:
+            raise RuntimeError("Fetcher did not return a file path.")
+        return Path(stream.result)
+    if not ready:
+        raise TimeoutError(f"Nothing buffered for {song_name!r} yet")
+    return stream
+
+
+def _playlist_dir(playlist_name: str) -> Path:
     # Base playlists dir
     playlists_dir = Path(__file__).resolve().parent / "playlists"
     playlists_dir.mkdir(parents=True, exist_ok=True)
@@ -112,40 +168,137 @@ def find_or_download_in_playlist(playlist_name: str, song_name: str) -> Path:
     # Specific playlist folder
     playlist_dir = playlists_dir / playlist_name
     playlist_dir.mkdir(parents=True, exist_ok=True)
+    return playlist_dir
+
+
+def _find_local_in_playlist(playlist_dir: Path, song_name: str) -> Path | None:
+    playlist_index = library_index.index_for(playlist_dir)
+    return playlist_index.find(song_name) or _find_fuzzy_match(playlist_index, song_name)
+
+
+def _link_into_playlist(playlist_dir: Path, stored: Path) -> Path:
+    """
+    Make a library file show up in a playlist folder without a second copy:
+    hardlink it, else symlink it, and only copy as a last resort. The file in
+    music/ stays put, so neither the library nor other playlists lose it.
+    """
+    stored = Path(stored)
+    target_path = playlist_dir / stored.name
+    if target_path.exists():
+        return target_path
+    try:
+        os.link(stored, target_path)
+    except OSError:
+        try:
+            os.symlink(stored.resolve(), target_path)
+        except OSError:
+            shutil.copy2(stored, target_path)
+    library_index.file_added(target_path)
+    return target_path
+
+
+def _add_to_playlist(playlist_dir: Path, song_name: str) -> Path:
+    # Already in the library (or another playlist): link it, no download.
+    # Otherwise download into music/ (the store, keyed by video id) and link that.
+    stored = find_local(song_name) or fetch_with_fetcher(song_name)
+    return _link_into_playlist(playlist_dir, stored)
+
+
+def find_or_download_in_playlist(playlist_name: str, song_name: str) -> Path:
+    """
+    Like find_or_download(), but returns a file inside
+    playlists/<playlist_name>/ instead of MUSIC_DIR.
+
+    Creates the folder if needed and searches there first. Songs not in
+    the playlist yet are linked in from the library, downloading them
+    into the library first if needed.
+    """
+    playlist_dir = _playlist_dir(playlist_name)
 
     # Local search in this playlist only
-    def _candidate_audio_files_in_playlist():
-        exts = {".m4a", ".webm", ".mp4", ".mp3", ".opus"}
-        for p in playlist_dir.iterdir():
-            if p.is_file() and p.suffix.lower() in exts:
-                yield p
-
-    def _find_local_match_in_playlist():
-        q = _normalize(song_name)
-        # Exact match
-        for path in _candidate_audio_files_in_playlist():
-            if _normalize(path.stem) == q:
-                return path
-        # Fallback substring match
-        for path in _candidate_audio_files_in_playlist():
-            stem_norm = _normalize(path.stem)
-            if q in stem_norm or stem_norm in q:
-                return path
-        return None
-
-    # Try to find locally
-    local = _find_local_match_in_playlist()
+    local = _find_local_in_playlist(playlist_dir, song_name)
     if local:
         return local
 
-    # Download into this playlist folder
-    downloaded = fetch_with_fetcher(song_name)
-    # Move it into the playlist folder if needed
-    downloaded = Path(downloaded)
-    target_path = playlist_dir / downloaded.name
-    if downloaded.resolve() != target_path.resolve():
-        downloaded.replace(target_path)
-    return target_path
+    return _add_to_playlist(playlist_dir, song_name)
+
+
+class ResolveResult(NamedTuple):
+    query: str
+    path: Path | None          # None when error is set
+    error: Exception | None
+    downloaded: bool           # False for local hits
+
+
+def find_or_download_many(queries: Iterable[str], playlist: str | None = None,
+                          max_workers: int = 4,
+                          priority: int = scheduler.ADD_TO_PLAYLIST) -> Iterator[ResolveResult]:
+    """
+    Batch version of find_or_download() / find_or_download_in_playlist().
+
+    Every local hit is resolved first in one pass over the index and yielded
+    straight away; only the misses are submitted to the download scheduler at
+    `priority`, at most `max_workers` at a time (the next one goes in as one
+    finishes), and yielded as each one finishes. A failing item yields a result
+    with `error` set instead of aborting the batch. Repeated queries are
+    downloaded once and yielded once per occurrence.
+    """
+    playlist_dir = _playlist_dir(playlist) if playlist else None
+
+    misses: dict[str, list[str]] = {}
+    for q in queries:
+        q = q.strip()
+        if not q:
+            continue
+        try:
+            if playlist_dir:
+                local = _find_local_in_playlist(playlist_dir, q)
+                if not local:
+                    stored = find_local(q)
+                    local = _link_into_playlist(playlist_dir, stored) if stored else None
+            else:
+                local = find_local(q)
+        except Exception as e:
+            yield ResolveResult(q, None, e, False)
+            continue
+        if local:
+            yield ResolveResult(q, local, None, False)
+        else:
+            misses.setdefault(_normalize(q), []).append(q)
+
+    if not misses:
+        return
+
+    def fetch(q: str) -> Path:
+        path = fetch_with_fetcher(q)
+        return _link_into_playlist(playlist_dir, path) if playlist_dir else path
+
+    waiting = iter(misses.values())
+    running = {}  # future -> (job, queries)
+    try:
+        while True:
+            # top up to max_workers downloads in flight
+            for qs in waiting:
+                job = scheduler.submit(fetch, qs[0], priority=priority, label=qs[0])
+                running[job.future] = (job, qs)
+                if len(running) >= max(1, max_workers):
+                    break
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                _job, qs = running.pop(fut)
+                try:
+                    path, err = fut.result(), None
+                except Exception as e:
+                    path, err = None, e
+                for q in qs:
+                    yield ResolveResult(q, path, err, err is None)
+    finally:
+        # consumer stopped early: drop the downloads still queued or running
+        for job, _qs in running.values():
+            if not job.done():
+                job.cancel()
 
 
 # ---------- Optional: CLI/back-compat that also plays ----------
@@ -160,7 +313,9 @@ def _play_file_direct(path: Path) -> None:
 
     if vlc is not None:
         try:
-            instance = vlc.Instance("--no-video")
+            # the process-wide libVLC instance the GUI's players use too
+            from playback_service import shared_instance
+            _vlc, instance = shared_instance()
             player = instance.media_player_new()
             media = instance.media_new(str(path))
             player.set_media(media)
@@ -0,0 +1,162 @@
+# sim_backend.py
+"""
+Simulated playback backend: no audio device, no libVLC, no real time.
+
+Players run on a shared virtual clock that only moves when advance() (or
+finish_current()) is called, and every event is delivered synchronously on
+the caller's thread, so runs are deterministic and as fast as the code
+driving them. Meant for headless tests and for benchmarking the queue /
+transition logic:
+
+    backend = SimulatedBackend(durations={Path("a.m4a"): 200.0})
+    svc = PlaybackService(backend=backend)
+    svc.play(Path("a.m4a"))
+    backend.advance(10.0)        # 10 s of playback, instantly
+    backend.finish_current()     # jump to the end: ended -> handoff / on_finished
+"""
+
+from __future__ import annotations
+import threading
+from pathlib import Path
+from typing import Callable, Mapping, Optional, Union
+
+from playback_service import BackendPlayer, PlaybackBackend, PlayerListener
+from progressive import GrowingFile
+
+Durations = Union[Mapping[Path, float], Callable[[Path], float], None]
+
+
+class SimPlayer(BackendPlayer):
+    def __init__(self, backend: "SimulatedBackend") -> None:
+        self._backend = backend
+        self._listener: Optional[PlayerListener] = None
+        self.source: Optional[Path] = None
+        self.state = "nothingspecial"
+        self.time_ms = 0
+        self.length_ms = 0
+        self.volume = 100
+
+    # ---------- BackendPlayer ----------
+
+    def set_listener(self, listener: PlayerListener) -> None:
+        self._listener = listener
+
+    def load(self, source: Path | GrowingFile, preparse: bool = False) -> None:
+        if self.state in ("playing", "paused"):
+            self.stop()
+        self.source = Path(source)
+        self.length_ms = int(self._backend.duration_of(self.source) * 1000)
+        self.time_ms = 0
+        self.state = "nothingspecial"
+
+    def play(self) -> None:
+        if self.source is None:
+            return
+        if self.state in ("ended", "stopped"):
+            self.time_ms = 0
+        self.state = "playing"
+        self._emit("opening")
+        self._emit("length", self.length_ms)
+        self._emit("playing")
+
+    def set_pause(self, paused: bool) -> None:
+        if paused and self.state == "playing":
+            self.state = "paused"
+            self._emit("paused")
+        elif not paused and self.state == "paused":
+            self.state = "playing"
+            self._emit("playing")
+
+    def stop(self) -> None:
+        if self.state == "nothingspecial":
+            return
+        self.state = "stopped"
+        self.time_ms = 0
+        self._emit("stopped")
+
+    def set_time(self, ms: int) -> None:
+        self.time_ms = max(0, min(ms, self.length_ms))
+        self._emit("time", self.time_ms)
+
+    def set_volume(self, volume: int) -> None:
+        self.volume = volume
+
+    # ---------- Clock ----------
+
+    def remaining_ms(self) -> int:
+        return self.length_ms - self.time_ms if self.state == "playing" else 0
+
+    def _tick(self, ms: int) -> None:
+        self.time_ms += ms
+        self._emit("time", self.time_ms)
+        if self.time_ms >= self.length_ms:
+            self.time_ms = self.length_ms
+            self.state = "ended"
+            self._backend.ended_count += 1
+            self._emit("ended")
+
+    def _emit(self, kind: str, value: Optional[int] = None) -> None:
+        if self._listener is not None:
+            self._listener(kind, value)
+
+
+class SimulatedBackend(PlaybackBackend):
+    # events are synchronous: PlaybackService hands over inline, no thread
+    deferred_handoff = False
+
+    def __init__(self, durations: Durations = None, default_length: float = 180.0) -> None:
+        """
+        durations: seconds per track, as a mapping or a function of the path;
+                   tracks it does not cover last default_length seconds.
+        """
+        self._durations = durations
+        self.default_length = default_length
+        self.now_ms = 0
+        self.ended_count = 0
+        self._players: list[SimPlayer] = []
+        self._lock = threading.RLock()
+
+    def new_player(self) -> SimPlayer:
+        pl = SimPlayer(self)
+        with self._lock:
+            self._players.append(pl)
+        return pl
+
+    def duration_of(self, path: Path) -> float:
+        d = None
+        if callable(self._durations):
+            d = self._durations(path)
+        elif self._durations is not None:
+            d = self._durations.get(path)
+        return float(d) if d is not None else self.default_length
+
+    def advance(self, seconds: float) -> None:
+        """
+        Move the virtual clock forward. A track that ends on the way fires
+        "ended" at its exact end, and whatever starts in response (a gapless
+        handoff, a new play()) gets the rest of the time.
+        """
+        left = int(seconds * 1000)
+        with self._lock:
+            while left > 0:
+                playing = [p for p in self._players if p.state == "playing"]
+                if not playing:
+                    self.now_ms += left
+                    return
+                # up to the next track end (0 for a track already at its end)
+                step = min(left, min(p.remaining_ms() for p in playing))
+                self.now_ms += step
+                left -= step
+                for p in playing:
+                    # a handoff during an earlier _tick may have stopped it
+                    if p.state == "playing":
+                        p._tick(step)
+
+    def finish_current(self) -> bool:
+        """Jump to the end of the playing track. False if nothing is playing."""
+        with self._lock:
+            playing = [p for p in self._players if p.state == "playing"]
+            if not playing:
+                return False
+            self.advance(min(p.remaining_ms() for p in playing) / 1000.0)
+            return True
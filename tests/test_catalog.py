@@ -0,0 +1,48 @@
+import shutil
+
+import catalog
+import change_tracker
+
+
+def _catalog(tmp_path):
+    music, playlists = tmp_path / "music", tmp_path / "playlists"
+    music.mkdir()
+    playlists.mkdir()
+    cat = catalog.Catalog(tmp_path / "media.db", music, playlists)
+    return cat, music, playlists
+
+
+def test_late_folder_removals_do_not_bring_back_a_deleted_playlist(tmp_path):
+    cat, _music, playlists = _catalog(tmp_path)
+    (playlists / "Mix").mkdir()
+    (playlists / "Mix" / "a.m4a").write_bytes(b"x")
+    root = change_tracker.DirectoryTracker(playlists, kind="dirs")
+    folder = change_tracker.DirectoryTracker(playlists / "Mix")
+    root.subscribe(cat.apply_changes)
+    folder.subscribe(cat.apply_changes)
+    cat.sync()
+    assert cat.list_playlists() == ["Mix"]
+
+    shutil.rmtree(playlists / "Mix")
+    root.poll()
+    folder.poll()
+
+    assert cat.list_playlists() == []
+    cat.close()
+
+
+def test_folder_changes_create_a_missing_playlist_and_say_so(tmp_path):
+    cat, _music, playlists = _catalog(tmp_path)
+    (playlists / "New").mkdir()
+    folder = change_tracker.DirectoryTracker(playlists / "New")
+    folder.subscribe(cat.apply_changes)
+    seen = []
+    cat.subscribe(seen.append)
+
+    (playlists / "New" / "a.m4a").write_bytes(b"x")
+    folder.record(added=[playlists / "New" / "a.m4a"])
+
+    assert cat.list_playlists() == ["New"]
+    assert [p.name for p in cat.playlist_tracks("New")] == ["a.m4a"]
+    assert seen[-1].playlists and seen[-1].tracks == ("New",)
+    cat.close()
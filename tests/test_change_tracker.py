@@ -0,0 +1,56 @@
+import catalog
+import change_tracker
+import library_index
+
+
+def test_file_being_written_stays_out_until_recorded(tmp_path):
+    music = tmp_path / "music"
+    music.mkdir()
+    (music / "Old_Song.m4a").write_bytes(b"x")
+    partial = music / "New_Song.m4a"
+
+    change_tracker.begin_write(partial)
+    try:
+        partial.write_bytes(b"partial")
+        tracker = change_tracker.DirectoryTracker(music)
+        index = library_index.LibraryIndex(music)
+        index.build()
+        cat = catalog.Catalog(tmp_path / "media.db", music, tmp_path / "playlists")
+        cat.sync_folder(cat.music_dir)
+
+        assert [p.name for p in tracker.entries()] == ["Old_Song.m4a"]
+        assert index.find("New_Song") is None
+        assert cat.search("New") == []
+    finally:
+        change_tracker.end_write(partial)
+
+    changes = tracker.record(added=[partial])
+    index.apply_changes(changes)
+    cat.apply_changes(changes)
+    assert index.find("New_Song") == partial
+    assert [h.path.name for h in cat.search("New")] == ["New_Song.m4a"]
+    cat.close()
+
+
+def test_end_write_matches_relative_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    change_tracker.begin_write("song.m4a")
+    assert change_tracker.being_written(tmp_path / "song.m4a")
+    change_tracker.end_write(tmp_path / "song.m4a")
+    assert not change_tracker.being_written("song.m4a")
+
+
+def test_broken_subscriber_is_logged_and_others_still_run(tmp_path, capsys):
+    tracker = change_tracker.DirectoryTracker(tmp_path)
+    seen = []
+
+    def broken(changes):
+        raise ValueError("boom")
+
+    tracker.subscribe(broken)
+    tracker.subscribe(seen.append)
+    (tmp_path / "a.m4a").write_bytes(b"x")
+    tracker.record(added=[tmp_path / "a.m4a"])
+
+    assert [p.name for c in seen for p in c.added] == ["a.m4a"]
+    assert "ValueError: boom" in capsys.readouterr().err
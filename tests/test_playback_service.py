@@ -0,0 +1,18 @@
+import pytest
+
+import playback_service
+import sim_backend
+
+
+def test_backend_missing_a_method_fails_when_created():
+    methods = {name: getattr(sim_backend.SimPlayer, name)
+               for name in playback_service.BackendPlayer.__abstractmethods__
+               if name != "set_volume"}
+    Incomplete = type("Incomplete", (playback_service.BackendPlayer,), methods)
+    with pytest.raises(TypeError, match="set_volume"):
+        Incomplete()
+
+
+def test_simulated_backend_implements_the_interface():
+    player = sim_backend.SimulatedBackend().new_player()
+    assert isinstance(player, playback_service.BackendPlayer)
@@ -0,0 +1,34 @@
+import threading
+import time
+
+import progressive
+
+
+def test_follower_mirrors_the_owner_stream():
+    owner = progressive.GrowingFile("song")
+    owner.update("/tmp/song.m4a", 1000, 500_000)
+    joiner = progressive.GrowingFile("song")
+    joiner.follow(owner)
+    assert (joiner.path, joiner.written, joiner.expected_size) == ("/tmp/song.m4a", 1000, 500_000)
+
+    owner.update("/tmp/song.m4a", 200_000, 500_000)
+    assert joiner.wait_ready(timeout=1)
+    assert joiner.written == 200_000
+
+
+def test_joined_download_without_stream_waits_for_the_result():
+    joiner = progressive.GrowingFile("song")
+    joiner.follow(None)
+    threading.Timer(0.3, joiner.finish, args=(None,)).start()
+
+    started = time.monotonic()
+    assert joiner.wait_ready(timeout=0.1)
+    assert joiner.done and time.monotonic() - started >= 0.25
+
+
+def test_joined_flag_reaches_followers_of_followers():
+    first = progressive.GrowingFile("song")
+    second = progressive.GrowingFile("song")
+    second.follow(first)
+    first.follow(None)
+    assert second.joined
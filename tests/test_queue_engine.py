@@ -0,0 +1,84 @@
+import random
+
+from queue_engine import QueueEngine
+
+
+def _play(q, count, ahead=3):
+    # what the GUI does: advance, then peek the prefetch window
+    out = []
+    for _ in range(count):
+        out.append(q.next())
+        q.peek(ahead)
+    return out
+
+
+def test_every_cycle_plays_each_track_once():
+    n = 10
+    q = QueueEngine(range(n), shuffle=True, rng=random.Random(1))
+    seq = _play(q, n * 5)
+    for c in range(5):
+        assert sorted(seq[c * n:(c + 1) * n]) == list(range(n))
+
+
+def test_no_repeat_across_cycle_boundary_with_peek():
+    for seed in range(300):
+        q = QueueEngine(range(8), shuffle=True, rng=random.Random(seed))
+        seq = _play(q, 8 * 6)
+        assert all(a != b for a, b in zip(seq, seq[1:])), seed
+
+
+def test_cycle_openings_vary():
+    q = QueueEngine(range(10), shuffle=True, rng=random.Random(7))
+    firsts = set()
+    for _ in range(50):
+        cycle = _play(q, 10)
+        firsts.add(frozenset(cycle[:5]))
+    assert len(firsts) > 10
+
+
+def test_sequential_loop_and_end():
+    q = QueueEngine("abc", loop=False)
+    assert [q.next() for _ in range(4)] == ["a", "b", "c", None]
+    q = QueueEngine("abc")
+    assert [q.next() for _ in range(5)] == ["a", "b", "c", "a", "b"]
+
+
+def test_previous_walks_history():
+    q = QueueEngine("abcd")
+    for _ in range(3):
+        q.next()
+    assert q.previous() == "b"
+    assert q.previous() == "a"
+    assert q.previous() is None
+    assert q.next() == "b"
+
+
+def test_insert_next_and_remove():
+    q = QueueEngine("abcd")
+    q.next()
+    q.insert_next("z")
+    assert q.peek(2) == ["z", "b"]
+    assert q.remove("b") == 1
+    assert "b" not in q
+    assert q.peek(4) == ["z", "c", "d", "a"]
+    # the playing entry stays
+    q.remove("a")
+    assert q.current == "a"
+
+
+def test_play_now_keeps_the_upcoming_order():
+    q = QueueEngine("abcd", loop=False)
+    q.next()
+    assert q.play_now("c") == "c"
+    assert q.current == "c"
+    assert q.peek(3) == ["b", "c", "d"]
+    assert q.previous() == "a"
+
+
+def test_remove_key():
+    q = QueueEngine("abcd")
+    q.tag("a", "dir1")
+    q.tag("b", "dir1")
+    q.next()
+    assert q.remove_key("dir1") == 1
+    assert q.tracks == ["c", "d"]
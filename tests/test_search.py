@@ -0,0 +1,32 @@
+import threading
+import time
+from pathlib import Path
+
+import search
+
+
+def test_find_or_download_many_bounds_parallel_downloads(monkeypatch):
+    lock = threading.Lock()
+    running = peak = 0
+
+    def fetch(q):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        if q == "broken":
+            raise RuntimeError("no such video")
+        return Path("/tmp") / q
+
+    monkeypatch.setattr(search, "fetch_with_fetcher", fetch)
+    monkeypatch.setattr(search, "find_local", lambda q: None)
+    queries = [f"song {i}" for i in range(8)] + ["broken", "song 1"]
+
+    results = list(search.find_or_download_many(queries, max_workers=2))
+
+    assert peak <= 2
+    assert sorted(r.query for r in results) == sorted(queries)
+    assert [r.query for r in results if r.error] == ["broken"]
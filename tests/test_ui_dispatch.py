@@ -0,0 +1,68 @@
+import threading
+
+import ui_dispatch
+
+
+class FakeRoot:
+    """Stands in for the Tk root: after() only records what was scheduled."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, fn):
+        self.pending.append((ms, fn))
+
+    def run_next(self):
+        ms, fn = self.pending.pop(0)
+        fn()
+        return ms
+
+
+def test_nothing_is_scheduled_while_idle():
+    root = FakeRoot()
+    ui = ui_dispatch.UIDispatcher(root)
+    assert root.pending == []
+
+    seen = []
+    worker = threading.Thread(target=lambda: [ui.post(seen.append, i) for i in range(5)])
+    worker.start()
+    worker.join()
+    # one wake-up for the whole burst
+    assert len(root.pending) == 1
+    root.run_next()
+    assert seen == [0, 1, 2, 3, 4]
+    assert root.pending == []
+
+
+def test_failed_wake_up_does_not_wedge_the_queue():
+    root = FakeRoot()
+    ui = ui_dispatch.UIDispatcher(root)
+    real_after = root.after
+
+    def broken_after(ms, fn):
+        raise RuntimeError("main thread is not in main loop")
+
+    root.after = broken_after
+    seen = []
+    ui.post(seen.append, 1)
+    root.after = real_after
+    ui.post(seen.append, 2)
+    root.run_next()
+    assert seen == [1, 2]
+
+
+def test_coalesced_posts_run_latest_once():
+    root = FakeRoot()
+    ui = ui_dispatch.UIDispatcher(root)
+    seen = []
+    ui.post_coalesced("status", seen.append, "a")
+    ui.post(seen.append, "x")
+    ui.post_coalesced("status", seen.append, "b")
+    ui.post(lambda: 1 / 0)
+    ui.post(seen.append, "y")
+    root.run_next()
+
+    assert seen == ["b", "x", "y"]
+    stats = ui.stats()
+    assert stats["coalesced"] == 1 and stats["failed"] == 1
+    assert root.pending == []
@@ -0,0 +1,144 @@
+# ui_dispatch.py
+"""
+One channel from worker threads to the Tk thread.
+
+Workers never touch widgets: they post() callables (or post_coalesced()
+ones, keyed) onto a queue, and the Tk loop drains the queue in batches, at
+most once per frame. Keyed posts replace each other while waiting, so a
+burst of status or progress updates costs one widget update per frame: the
+latest value runs, at the place in line of the first one still pending.
+
+Posting only touches Tk to wake the loop when the queue goes from idle to
+busy; everything in between is a deque append under a lock. Nothing is
+scheduled while nothing is posted, so an idle app is never woken.
+
+stats() reports queue depth, how much was coalesced away, and drain
+latency (post -> run) and duration.
+"""
+
+from __future__ import annotations
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable, Hashable, Optional
+
+# At most one drain per frame (~60 Hz)
+FRAME_MS = 16
+
+
+class UIDispatcher:
+    def __init__(self, root, frame_ms: int = FRAME_MS) -> None:
+        """root: any Tk widget; its after() schedules the drains."""
+        self._root = root
+        self.frame_ms = frame_ms
+        self._lock = threading.Lock()
+        # entries: (posted_at, key or None, fn, args); keyed entries take their
+        # fn / args from _latest when drained
+        self._queue: deque = deque()
+        self._latest: dict[Hashable, tuple[Callable, tuple]] = {}
+        self._scheduled = False
+        self._last_drain = 0.0
+        # counters for stats()
+        self._posted = 0
+        self._coalesced = 0
+        self._run = 0
+        self._failed = 0
+        self._drains = 0
+        self._max_depth = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._drain_total = 0.0
+        self._drain_max = 0.0
+
+    # ---------- Public API (any thread) ----------
+
+    def post(self, fn: Callable[..., Any], *args) -> None:
+        """Run fn(*args) on the Tk thread, in order with other posts."""
+        self._put(None, fn, args)
+
+    def post_coalesced(self, key: Hashable, fn: Callable[..., Any], *args) -> None:
+        """Like post(), but a later post with the same key replaces this one if it hasn't run yet."""
+        self._put(key, fn, args)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "depth": len(self._queue),
+                "max_depth": self._max_depth,
+                "posted": self._posted,
+                "coalesced": self._coalesced,
+                "run": self._run,
+                "failed": self._failed,
+                "drains": self._drains,
+                "avg_batch": self._run / self._drains if self._drains else 0.0,
+                "avg_latency_ms": 1000 * self._latency_total / self._run if self._run else 0.0,
+                "max_latency_ms": 1000 * self._latency_max,
+                "avg_drain_ms": 1000 * self._drain_total / self._drains if self._drains else 0.0,
+                "max_drain_ms": 1000 * self._drain_max,
+            }
+
+    # ---------- Internals ----------
+
+    def _put(self, key: Optional[Hashable], fn: Callable, args: tuple) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            self._posted += 1
+            if key is not None:
+                if key in self._latest:
+                    # still waiting: just swap in the newer update
+                    self._latest[key] = (fn, args)
+                    self._coalesced += 1
+                    return
+                self._latest[key] = (fn, args)
+            self._queue.append((now, key, fn, args))
+            self._max_depth = max(self._max_depth, len(self._queue))
+            if self._scheduled:
+                return
+            self._scheduled = True
+            # keep to one drain per frame
+            delay = max(0, int(self.frame_ms - (now - self._last_drain) * 1000))
+        try:
+            self._root.after(delay, self._drain)
+        except Exception:
+            # e.g. the root is being destroyed: leave the flag clear so the
+            # next post tries again instead of waiting on a drain that never comes
+            with self._lock:
+                self._scheduled = False
+            traceback.print_exc()
+
+    def _drain(self) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            batch = list(self._queue)
+            self._queue.clear()
+            latest, self._latest = self._latest, {}
+            # anything posted from here on schedules the next drain
+            self._scheduled = False
+            self._last_drain = started
+
+        run = failed = 0
+        latency_total = latency_max = 0.0
+        for posted_at, key, fn, args in batch:
+            if key is not None:
+                fn, args = latest[key]
+            wait = time.perf_counter() - posted_at
+            latency_total += wait
+            latency_max = max(latency_max, wait)
+            try:
+                fn(*args)
+            except Exception:
+                # one bad update must not drop the rest of the batch
+                failed += 1
+                traceback.print_exc()
+            run += 1
+
+        took = time.perf_counter() - started
+        with self._lock:
+            self._drains += 1
+            self._run += run
+            self._failed += failed
+            self._latency_total += latency_total
+            self._latency_max = max(self._latency_max, latency_max)
+            self._drain_total += took
+            self._drain_max = max(self._drain_max, took)
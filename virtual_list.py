@@ -0,0 +1,352 @@
+# virtual_list.py
+"""
+Listbox look-alike for very long lists.
+
+VirtualList only draws the rows in view, from a small pool of canvas items
+re-used as it scrolls, so showing or scrolling 50,000 rows costs the same as
+showing 20. Rows may not be known yet (None): they are drawn as "…" and
+reported to on_missing, which is how PagedLoader pages them in from a
+background thread, the page in view first.
+
+The Listbox calls the pages rely on are kept: insert / delete / get / size,
+curselection / selection_clear / selection_set, see, yview (so a Scrollbar
+can drive it), <<ListboxSelect>>, and bindings such as <Delete> or
+<Double-Button-1>.
+"""
+
+from __future__ import annotations
+import threading
+import tkinter as tk
+import tkinter.font as tkfont
+from typing import Callable, Optional
+
+# Rows fetched per background query
+PAGE_SIZE = 500
+
+_UNKNOWN = "…"
+_TEXT_X = 6
+
+
+class VirtualList(tk.Canvas):
+    def __init__(self, master, bg: str = "white", fg: str = "black", font=None,
+                 selectbackground: str = "#cccccc", yscrollcommand: Optional[Callable] = None,
+                 padding: int = 4, **kwargs) -> None:
+        super().__init__(master, bg=bg, **kwargs)
+        self._fg = fg
+        self._font = tkfont.Font(font=font) if font else tkfont.nametofont("TkDefaultFont")
+        self._selbg = selectbackground
+        self.row_height = self._font.metrics("linespace") + padding
+        self._yscrollcommand = yscrollcommand
+        # called with (first, last) row indices in view that are still None
+        self.on_missing: Optional[Callable[[int, int], None]] = None
+
+        self._rows: list[Optional[str]] = []
+        self._selected: set[int] = set()
+        self._anchor: Optional[int] = None
+        self._top = 0  # pixel offset of the view into the full list
+        self._pool: list[tuple[int, int]] = []  # (highlight rect, text) per visible slot
+        self._message = self.create_text(_TEXT_X, 0, anchor="nw", text="", fill=fg, font=self._font)
+        self._redraw_job = None
+
+        self.bind("<Configure>", lambda _e: self._redraw())
+        self.bind("<Button-1>", self._on_click)
+        self.bind("<Control-Button-1>", self._on_ctrl_click)
+        self.bind("<Shift-Button-1>", self._on_shift_click)
+        self.bind("<MouseWheel>", self._on_wheel)
+        self.bind("<Button-4>", lambda _e: self.yview_scroll(-3, "units"))
+        self.bind("<Button-5>", lambda _e: self.yview_scroll(3, "units"))
+        self.bind("<Up>", lambda _e: self._move(-1))
+        self.bind("<Down>", lambda _e: self._move(1))
+
+    # ---------- Rows ----------
+
+    def size(self) -> int:
+        return len(self._rows)
+
+    def get(self, first, last=None):
+        """Text of a row ("" while it is not loaded); a tuple for a range, like Listbox."""
+        if last is None:
+            return self._rows[self._index(first)] or ""
+        i, j = self._index(first), min(self._index(last), len(self._rows) - 1)
+        return tuple(r or "" for r in self._rows[i:j + 1])
+
+    def index_of(self, text: str) -> Optional[int]:
+        try:
+            return self._rows.index(text)
+        except ValueError:
+            return None
+
+    def insert(self, index, *items: str) -> None:
+        i = min(self._index(index), len(self._rows))
+        self._rows[i:i] = items
+        self._selected = {j + len(items) if j >= i else j for j in self._selected}
+        self._schedule_redraw()
+
+    def delete(self, first, last=None) -> None:
+        i = self._index(first)
+        j = i if last is None else min(self._index(last), len(self._rows) - 1)
+        if j < i:
+            return
+        del self._rows[i:j + 1]
+        n = j - i + 1
+        self._selected = {k - n if k > j else k for k in self._selected if not i <= k <= j}
+        self._schedule_redraw()
+
+    def reset(self, count: int = 0) -> None:
+        """Drop everything; `count` rows still to be loaded (None) take their place."""
+        self._rows = [None] * count
+        self._selected.clear()
+        self._anchor = None
+        self._top = 0
+        self._schedule_redraw()
+
+    def fill(self, offset: int, items: list[str]) -> None:
+        """Set loaded rows offset .. offset+len(items)-1 (clipped to the list)."""
+        items = items[: max(0, len(self._rows) - offset)]
+        self._rows[offset:offset + len(items)] = items
+        first = self._top // self.row_height
+        if offset <= first + self._visible_rows() and offset + len(items) >= first:
+            self._schedule_redraw()
+
+    def set_message(self, text: Optional[str]) -> None:
+        """Text shown while the list is empty, e.g. "(no files)"."""
+        self.itemconfigure(self._message, text=text or "")
+
+    # ---------- Selection ----------
+
+    def curselection(self) -> tuple[int, ...]:
+        return tuple(sorted(self._selected))
+
+    def selection_clear(self, first=0, last=None) -> None:
+        if last is None and first == 0:
+            self._selected.clear()
+        else:
+            i = self._index(first)
+            j = i if last is None else self._index(last)
+            self._selected = {k for k in self._selected if not i <= k <= j}
+        self._schedule_redraw()
+
+    def selection_set(self, first, last=None) -> None:
+        i = self._index(first)
+        j = i if last is None else min(self._index(last), len(self._rows) - 1)
+        self._selected.update(range(i, j + 1))
+        self._schedule_redraw()
+
+    def see(self, index) -> None:
+        i = self._index(index)
+        y = i * self.row_height
+        h = self.winfo_height()
+        if y < self._top:
+            self._top = y
+        elif y + self.row_height > self._top + h:
+            self._top = y + self.row_height - h
+        self._schedule_redraw()
+
+    # ---------- Scrolling (Scrollbar protocol) ----------
+
+    def yview(self, *args):
+        if not args:
+            total = max(1, len(self._rows) * self.row_height)
+            return (self._top / total, min(1.0, (self._top + self.winfo_height()) / total))
+        if args[0] == "moveto":
+            self.yview_moveto(float(args[1]))
+        elif args[0] == "scroll":
+            self.yview_scroll(int(args[1]), args[2])
+
+    def yview_moveto(self, fraction: float) -> None:
+        self._top = int(fraction * len(self._rows) * self.row_height)
+        self._redraw()
+
+    def yview_scroll(self, number: int, what: str) -> None:
+        if what.startswith("page"):
+            step = max(self.row_height, self.winfo_height() - self.row_height)
+        else:
+            step = self.row_height
+        self._top += number * step
+        self._redraw()
+
+    # ---------- Drawing ----------
+
+    def _index(self, index) -> int:
+        return len(self._rows) if index in (tk.END, "end") else int(index)
+
+    def _visible_rows(self) -> int:
+        return self.winfo_height() // self.row_height + 2
+
+    def _schedule_redraw(self) -> None:
+        # many inserts / fills in one go: draw once, when Tk is idle
+        if self._redraw_job is None:
+            self._redraw_job = self.after_idle(self._redraw)
+
+    def _redraw(self) -> None:
+        if self._redraw_job is not None:
+            self.after_cancel(self._redraw_job)
+            self._redraw_job = None
+        rh = self.row_height
+        w, h = self.winfo_width(), self.winfo_height()
+        self._top = max(0, min(self._top, len(self._rows) * rh - h))
+        first = self._top // rh
+        n = max(0, min(len(self._rows) - first, self._visible_rows()))
+
+        while len(self._pool) < n:
+            rect = self.create_rectangle(0, 0, 0, 0, fill=self._selbg, outline="", state="hidden")
+            text = self.create_text(0, 0, anchor="w", fill=self._fg, font=self._font)
+            self._pool.append((rect, text))
+
+        missing = []
+        for k, (rect, text) in enumerate(self._pool):
+            if k >= n:
+                self.itemconfigure(rect, state="hidden")
+                self.itemconfigure(text, state="hidden")
+                continue
+            i = first + k
+            y = i * rh - self._top
+            row = self._rows[i]
+            if row is None:
+                missing.append(i)
+            self.coords(rect, 0, y, w, y + rh)
+            self.itemconfigure(rect, state="normal" if i in self._selected else "hidden")
+            self.coords(text, _TEXT_X, y + rh / 2)
+            self.itemconfigure(text, text=_UNKNOWN if row is None else row, state="normal")
+
+        self.itemconfigure(self._message, state="hidden" if self._rows else "normal")
+        if self._yscrollcommand is not None:
+            self._yscrollcommand(*self.yview())
+        if missing and self.on_missing is not None:
+            self.on_missing(missing[0], missing[-1])
+
+    # ---------- Mouse / keys ----------
+
+    def _row_at(self, y: int) -> Optional[int]:
+        i = (self._top + y) // self.row_height
+        return i if 0 <= i < len(self._rows) else None
+
+    def _clickable(self) -> bool:
+        self.focus_set()
+        return str(self.cget("state")) != "disabled"
+
+    def _select_only(self, i: int) -> None:
+        self._selected = {i}
+        self._anchor = i
+        self._schedule_redraw()
+        self.event_generate("<<ListboxSelect>>")
+
+    def _on_click(self, e) -> None:
+        i = self._row_at(e.y)
+        if self._clickable() and i is not None:
+            self._select_only(i)
+
+    def _on_ctrl_click(self, e) -> None:
+        i = self._row_at(e.y)
+        if not self._clickable() or i is None:
+            return
+        self._selected ^= {i}
+        self._anchor = i
+        self._schedule_redraw()
+        self.event_generate("<<ListboxSelect>>")
+
+    def _on_shift_click(self, e) -> None:
+        i = self._row_at(e.y)
+        if not self._clickable() or i is None:
+            return
+        a = self._anchor if self._anchor is not None else i
+        self._selected = set(range(min(a, i), max(a, i) + 1))
+        self._schedule_redraw()
+        self.event_generate("<<ListboxSelect>>")
+
+    def _on_wheel(self, e) -> None:
+        # Windows: multiples of 120 per notch; macOS: small deltas
+        notches = int(e.delta / 120) or (1 if e.delta > 0 else -1)
+        self.yview_scroll(-3 * notches, "units")
+
+    def _move(self, step: int) -> None:
+        if not self._rows:
+            return
+        cur = self._anchor if self._anchor is not None else -step
+        i = max(0, min(len(self._rows) - 1, cur + step))
+        self._select_only(i)
+        self.see(i)
+
+
+class PagedLoader:
+    """
+    Fills a VirtualList of `total` rows from fetch(offset, limit) on a
+    background thread: pages the list asks for (rows in view) first, then
+    the rest in order. Rows are handed to the list through post(fn, *args),
+    which must run fn on the Tk thread (the app's UIDispatcher.post).
+    """
+
+    def __init__(self, view: VirtualList, total: int,
+                 fetch: Callable[[int, int], list[str]], post: Callable[..., None],
+                 page_size: int = PAGE_SIZE,
+                 on_done: Optional[Callable[[], None]] = None) -> None:
+        self.view = view
+        self.page_size = page_size
+        self._fetch = fetch
+        self._post = post
+        self._on_done = on_done
+        self._pending = set(range((total + page_size - 1) // page_size))
+        self._wanted: list[int] = []
+        self._next = 0
+        self._cond = threading.Condition()
+        self._cancelled = False
+        self.complete = not self._pending
+        view.on_missing = self.want
+        threading.Thread(target=self._run, name="paged-loader", daemon=True).start()
+
+    def want(self, first: int, last: int) -> None:
+        """Rows first..last are needed now (called by the view)."""
+        with self._cond:
+            pages = range(first // self.page_size, last // self.page_size + 1)
+            self._wanted = [p for p in pages if p in self._pending] + self._wanted
+            self._cond.notify()
+
+    def cancel(self) -> None:
+        with self._cond:
+            self._cancelled = True
+        if self.view.on_missing == self.want:
+            self.view.on_missing = None
+
+    def _take(self) -> Optional[int]:
+        with self._cond:
+            if self._cancelled or not self._pending:
+                return None
+            while self._wanted:
+                page = self._wanted.pop(0)
+                if page in self._pending:
+                    break
+            else:
+                # pages are only ever taken out, so the scan can go forward
+                while self._next not in self._pending:
+                    self._next += 1
+                page = self._next
+            self._pending.discard(page)
+            return page
+
+    def _run(self) -> None:
+        while True:
+            page = self._take()
+            if page is None:
+                break
+            offset = page * self.page_size
+            try:
+                rows = self._fetch(offset, self.page_size)
+            except Exception as e:
+                print(f"[virtual_list] loading rows {offset}+ failed: {e}")
+                break
+            self._post(self._deliver, offset, rows)
+        self._post(self._finish)
+
+    def _deliver(self, offset: int, rows: list[str]) -> None:
+        if not self._cancelled:
+            self.view.fill(offset, rows)
+
+    def _finish(self) -> None:
+        if self._cancelled:
+            return
+        # False only if a fetch failed part way
+        self.complete = not self._pending
+        if self.view.on_missing == self.want:
+            self.view.on_missing = None
+        if self._on_done is not None:
+            self._on_done()